@@ -0,0 +1,124 @@
+"""async_convert.py
+
+Run vgmstream CLI conversions from one asyncio event loop.
+
+With `convert_wem.py --async`, up to N vgmstream processes run at once
+without a Python worker process babysitting each one: their output is read
+by the loop, each decode gets a timeout after which the process is killed,
+and throughput is printed while the run is going. Files the built-in
+decoder handles (PCM / IMA ADPCM), and the target/format post-processing,
+run on the loop's default thread pool; so do libvgmstream / vgmstream module
+decodes when no CLI is available (without a timeout, a thread can't be
+killed).
+"""
+
+import asyncio
+import os
+import sys
+
+import convert_wem
+from convert_wem import (ConvertProgress, decode_with_library, decode_with_native, decode_with_vgmstream, fan_out_wav,
+                         finish_decoded, native_decodable, output_path)
+
+
+async def _run_cli(cli, in_path: str, out_path: str, timeout):
+    """One vgmstream CLI process; returns (ok, message). Killed after `timeout` seconds."""
+    exe, work_dir, template = cli
+    paths = {'{in}': os.path.abspath(in_path), '{out}': os.path.abspath(out_path)}
+    try:
+        proc = await asyncio.create_subprocess_exec(exe, *[paths.get(a, a) for a in template],
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.PIPE, cwd=work_dir)
+    except OSError as e:
+        return False, f'CLI 실행 실패: {e}'
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return False, f'시간 초과 ({timeout:g}초), 프로세스 종료'
+    if proc.returncode == 0 and os.path.exists(out_path):
+        return True, ''
+    text = (err or out).decode(errors='ignore').strip()
+    return False, f'종료 코드 {proc.returncode}' + (f': {text.splitlines()[-1]}' if text else '')
+
+
+async def convert_one(cli, wem: str, overwrite: bool, timeout, site_packages=None) -> bool:
+    out_path = output_path(wem)
+    if os.path.exists(out_path) and not overwrite:
+        return True
+    if native_decodable(wem):
+        return await asyncio.to_thread(decode_with_native, wem, out_path) is not None
+    if not cli:
+        backend = await asyncio.to_thread(decode_with_library, wem, out_path, site_packages)
+        if not backend:
+            backend = await asyncio.to_thread(decode_with_vgmstream, wem, out_path, site_packages)
+        if not backend:
+            print(f"[오류] 변환 실패: {wem}: libvgmstream / vgmstream 모듈 디코드 실패", file=sys.stderr)
+        return backend is not None
+    direct = convert_wem.TARGET == 'full' and out_path.lower().endswith('.wav')
+    decoded = out_path if direct else os.path.splitext(out_path)[0] + '.decoded.wav'
+    ok, message = await _run_cli(cli, wem, decoded, timeout)
+    try:
+        if ok and not direct:
+            await asyncio.to_thread(finish_decoded, decoded, out_path)
+    except Exception as e:
+        ok, message = False, f'출력 변환 실패: {e}'
+    if not ok:
+        # don't leave a half-written file that a later run would skip
+        for path in {decoded, out_path}:
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"[오류] 변환 실패: {wem}: {message}", file=sys.stderr)
+    elif not direct and os.path.exists(decoded):
+        os.remove(decoded)
+    return ok
+
+
+async def _convert_all(wems, cli, overwrite: bool, workers: int, timeout, fan_out, progress, site_packages):
+    it = iter(wems)
+
+    async def worker():
+        for wem in it:
+            try:
+                ok = await convert_one(cli, wem, overwrite, timeout, site_packages)
+            except Exception as e:
+                print(f"[오류] 변환 실패: {wem}: {e}", file=sys.stderr)
+                ok = False
+            progress.add(wem, ok)
+            if ok:
+                await asyncio.to_thread(fan_out_wav, wem, output_path(wem), fan_out, overwrite)
+            progress.report()
+
+    async def ticker():
+        # keep the rate line moving while every slot waits on a slow decode
+        while True:
+            await asyncio.sleep(1.0)
+            progress.report()
+
+    tick = asyncio.create_task(ticker())
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    finally:
+        tick.cancel()
+
+
+def convert_async(wems, cli, overwrite: bool, workers: int, timeout=None, fan_out=None, settings=None,
+                  site_packages=None):
+    """Convert `wems` with up to `workers` concurrent vgmstream processes.
+
+    `timeout` is seconds per file (None: no limit); `settings` is
+    convert_wem.worker_settings() of the caller (convert_wem.py run as a
+    script is a different module object). Without a `cli`, files are decoded
+    with libvgmstream or the vgmstream module from `site_packages`. Returns (success count, failed
+    files) like convert_wem.convert_files().
+    """
+    if settings:
+        convert_wem._init_worker(settings)
+    progress = ConvertProgress(len(wems))
+    if convert_wem.VERBOSE:
+        limit = f', 파일당 제한 {timeout:g}초' if timeout and cli else ''
+        print(f"[정보] 비동기 변환: 동시 실행 {workers}개{limit}")
+    asyncio.run(_convert_all(wems, cli, overwrite, workers, timeout, fan_out or {}, progress, site_packages))
+    progress.report(force=True)
+    return progress.ok, progress.failed
@@ -0,0 +1,145 @@
+"""audio_prep.py
+
+Prepare decoded audio for speech recognition: downmix to mono and resample
+to Whisper's 16 kHz with a NumPy polyphase (windowed-sinc) resampler, plus
+small WAV/FLAC readers and writers for the converter's output modes.
+
+NumPy is required for resampling; FLAC output additionally needs the
+optional `soundfile` package.
+"""
+
+import io
+import wave
+from functools import lru_cache
+from math import gcd
+
+from wav_io import PcmAudio, write_wav
+
+try:
+    import numpy as np
+except ImportError:  # resampling is unavailable without NumPy
+    np = None
+
+WHISPER_RATE = 16000
+
+# filter half-length in zero crossings of the lower band edge, and Kaiser beta
+ZERO_CROSSINGS = 16
+KAISER_BETA = 8.6
+# output samples computed per vectorized step (bounds the temporary arrays)
+BLOCK = 16384
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('numpy가 필요합니다 (pip install numpy)')
+
+
+def pcm_to_float(audio: PcmAudio):
+    """Interleaved integer PCM -> float32 array of shape (frames, channels) in [-1, 1)."""
+    require_numpy()
+    width = audio.sample_width
+    if width == 2:
+        x = np.frombuffer(audio.pcm, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 1:
+        x = (np.frombuffer(audio.pcm, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 3:
+        raw = np.frombuffer(audio.pcm, dtype=np.uint8)
+        raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        x = (((raw[:, 2] << 24) | (raw[:, 1] << 16) | (raw[:, 0] << 8)) >> 8).astype(np.float32) / 8388608.0
+    elif width == 4:
+        x = np.frombuffer(audio.pcm, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f'지원하지 않는 샘플 크기: {width}')
+    frames = len(x) // audio.channels
+    return x[:frames * audio.channels].reshape(frames, audio.channels)
+
+
+@lru_cache(maxsize=16)
+def _phase_table(up: int, down: int):
+    """Polyphase filter bank: table[r, k] multiplies x[i - k] for output phase r."""
+    factor = max(up, down)
+    half = ZERO_CROSSINGS * factor
+    n = np.arange(-half, half + 1)
+    h = np.sinc(n / factor) * np.kaiser(2 * half + 1, KAISER_BETA)
+    h *= up / h.sum()
+    k_max = half // up + 1
+    ks = np.arange(-k_max, k_max + 1)
+    table = np.zeros((up, len(ks)), dtype=np.float32)
+    for r in range(up):
+        taps = r + ks * up + half
+        valid = (taps >= 0) & (taps <= 2 * half)
+        table[r, valid] = h[taps[valid]]
+    return table, ks
+
+
+def resample(x, src_rate: int, dst_rate: int):
+    """Resample a 1-D float signal from `src_rate` to `dst_rate` (polyphase FIR)."""
+    require_numpy()
+    if src_rate == dst_rate or len(x) == 0:
+        return np.asarray(x, dtype=np.float32)
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    table, ks = _phase_table(up, down)
+    pad = int(ks.max()) + 1
+    xp = np.concatenate([np.zeros(pad, np.float32), np.asarray(x, np.float32), np.zeros(pad, np.float32)])
+    n_out = -(-len(x) * up // down)
+    out = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, BLOCK):
+        t = np.arange(start, min(start + BLOCK, n_out), dtype=np.int64) * down
+        idx = (t // up)[:, None] - ks[None, :] + pad
+        out[start:start + len(t)] = np.einsum('ij,ij->i', table[t % up], xp[idx])
+    return out
+
+
+def whisper_float(audio: PcmAudio):
+    """Mono float32 samples at 16 kHz, as faster-whisper takes them."""
+    x = pcm_to_float(audio)
+    mono = x[:, 0] if x.shape[1] == 1 else x.mean(axis=1)
+    return resample(mono, audio.sample_rate, WHISPER_RATE)
+
+
+def float_to_pcm16(x) -> bytes:
+    return (np.clip(x, -1.0, 32767 / 32768) * 32768).round().astype('<i2').tobytes()
+
+
+def to_whisper(audio: PcmAudio) -> PcmAudio:
+    """16 kHz mono 16-bit copy of `audio` (returned unchanged if it already is)."""
+    if audio.channels == 1 and audio.sample_rate == WHISPER_RATE and audio.sample_width == 2:
+        return audio
+    return PcmAudio(float_to_pcm16(whisper_float(audio)), 1, WHISPER_RATE, 2)
+
+
+def read_wav(path) -> PcmAudio:
+    """Read an integer PCM .wav (a path or an open binary file) into memory."""
+    with wave.open(path if hasattr(path, 'read') else str(path), 'rb') as w:
+        return PcmAudio(w.readframes(w.getnframes()), w.getnchannels(), w.getframerate(), w.getsampwidth())
+
+
+def parse_wav(data: bytes) -> PcmAudio:
+    """read_wav() for a .wav held in memory (e.g. vgmstream-cli -p output)."""
+    return read_wav(io.BytesIO(data))
+
+
+def flac_available() -> bool:
+    try:
+        import soundfile  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def write_flac(path, audio: PcmAudio):
+    import soundfile
+    require_numpy()
+    if audio.sample_width != 2:
+        raise ValueError('FLAC 출력은 16비트 PCM만 지원합니다')
+    data = np.frombuffer(audio.pcm, dtype='<i2').reshape(-1, audio.channels)
+    soundfile.write(str(path), data, audio.sample_rate, subtype='PCM_16', format='FLAC')
+
+
+def write_audio(path, audio: PcmAudio):
+    """Write `audio` as .flac or .wav depending on the extension of `path`."""
+    if str(path).lower().endswith('.flac'):
+        write_flac(path, audio)
+    else:
+        write_wav(path, audio)
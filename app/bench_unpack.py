@@ -0,0 +1,169 @@
+"""bench_unpack.py
+
+Unpack throughput benchmark on a synthetic (or given) PCK corpus.
+
+Each configuration (executor x workers x writer) runs in a fresh child process
+through unpack_pck.unpack_all, so peak RSS is measured per configuration.
+Results (entries/s, MB/s, peak RSS, per-phase timings) are written to JSON for
+tracking regressions between releases.
+
+Usage examples:
+  python app/bench_unpack.py --workers 1,2,4 --executors thread,process
+  python app/bench_unpack.py --corpus D:/game/AudioAssets --workers 4 --output bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from proc_stats import peak_rss_mb
+
+HERE = Path(__file__).resolve().parent
+
+
+def clean_outputs(pcks):
+    for p in pcks:
+        out = p.with_suffix('')
+        if out.exists():
+            shutil.rmtree(out, ignore_errors=True)
+
+
+def run_one(config: dict) -> dict:
+    """Run one configuration in this process and return its measurements."""
+    import unpack_pck
+
+    phases = {}
+    start = time.perf_counter()
+    pcks = list(unpack_pck.find_pcks(Path(config['corpus'])))
+    phases['discover'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clean_outputs(pcks)
+    phases['clean'] = time.perf_counter() - start
+
+    PCKextract = BNK = None
+    if config['reader'] != 'mmap':
+        PCKextract, BNK = unpack_pck.ensure_hoyo_tools(config.get('runtime'))
+
+    # every pck is unpacked beside itself (removed again by clean_outputs)
+    summary = unpack_pck.unpack_all(pcks, Path(config['corpus']), PCKextract, BNK, config['workers'],
+                                    config['executor'], config.get('runtime'), config['reader'], None, None,
+                                    config['writer'], report=lambda *a, **k: None)
+    phases['unpack'] = summary['elapsed']
+    phases['parse_sum'] = summary['parse']
+    phases['write_sum'] = summary['write']
+
+    start = time.perf_counter()
+    clean_outputs(pcks)
+    phases['clean_after'] = time.perf_counter() - start
+
+    elapsed = summary['elapsed'] or 1e-9
+    return {
+        **{k: config[k] for k in ('executor', 'workers', 'writer', 'reader')},
+        'pcks': len(pcks),
+        'ok': summary['ok'],
+        'failed': summary['failed'],
+        'entries': summary['entries'],
+        'bytes': summary['bytes'],
+        'entries_per_s': round(summary['entries'] / elapsed, 1),
+        'mb_per_s': round(summary['bytes'] / 1048576 / elapsed, 2),
+        'utilization': round(summary['utilization'], 3),
+        'peak_rss_mb': max((v for v in peak_rss_mb() if v is not None), default=None),
+        'phases': {k: round(v, 4) for k, v in phases.items()},
+    }
+
+
+def _csv(value, cast=str):
+    return [cast(x.strip()) for x in value.split(',') if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark unpack_pck on a synthetic corpus')
+    parser.add_argument('--corpus', default=None, help='existing folder of .pck files (default: generate one)')
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--executors', default='thread,process', help='comma separated executors')
+    parser.add_argument('--writers', default='async', help='comma separated writer modes (async,sync)')
+    parser.add_argument('--reader', choices=['auto', 'mmap', 'hoyo'], default='mmap')
+    parser.add_argument('--runtime', default=None, help='runtime folder for HoyoAudioTools (reader auto/hoyo)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per configuration')
+    parser.add_argument('--output', '-o', default='bench_results.json', help='JSON results file')
+    # synthetic corpus shape (ignored with --corpus)
+    parser.add_argument('--pcks', type=int, default=4)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--min-size', type=int, default=2048)
+    parser.add_argument('--max-size', type=int, default=65536)
+    parser.add_argument('--banks', type=int, default=4)
+    parser.add_argument('--bank-wems', type=int, default=50)
+    parser.add_argument('--languages', default='sfx,english(us)')
+    parser.add_argument('--run-one', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # child mode: one configuration, JSON on the last stdout line
+        print(json.dumps(run_one(json.loads(args.run_one))), flush=True)
+        return
+
+    tmp = None
+    corpus_info = {}
+    if args.corpus:
+        corpus = Path(args.corpus)
+        corpus_info['path'] = str(corpus)
+    else:
+        from synth_pck import generate_corpus
+        tmp = tempfile.mkdtemp(prefix='pck_bench_')
+        corpus = Path(tmp)
+        corpus_info = {'synthetic': True, 'pcks': args.pcks, 'entries': args.entries, 'min_size': args.min_size,
+                       'max_size': args.max_size, 'banks': args.banks, 'bank_wems': args.bank_wems,
+                       'languages': _csv(args.languages)}
+        start = time.perf_counter()
+        generate_corpus(corpus, args.pcks, args.entries, args.min_size, args.max_size, _csv(args.languages),
+                        args.banks, args.bank_wems)
+        print(f'합성 코퍼스 생성: {corpus} ({time.perf_counter() - start:.2f}초)', flush=True)
+    corpus_info['bytes'] = sum(p.stat().st_size for p in corpus.rglob('*.pck'))
+
+    results = []
+    try:
+        for executor in _csv(args.executors):
+            for workers in _csv(args.workers, int):
+                for writer in _csv(args.writers):
+                    for rep in range(args.repeat):
+                        config = {'corpus': str(corpus), 'executor': executor, 'workers': workers,
+                                  'writer': writer, 'reader': args.reader, 'runtime': args.runtime}
+                        proc = subprocess.run([sys.executable, str(HERE / 'bench_unpack.py'), '--run-one',
+                                               json.dumps(config)], cwd=str(HERE), capture_output=True, text=True)
+                        lines = proc.stdout.strip().splitlines()
+                        if proc.returncode != 0 or not lines:
+                            print(f'실패: {executor} x{workers} {writer}\n{proc.stderr}', flush=True)
+                            continue
+                        res = json.loads(lines[-1])
+                        res['repeat'] = rep
+                        results.append(res)
+                        print(f"{executor:>7} x{workers:<3} {writer:<5} {res['entries_per_s']:>10.1f} 항목/s "
+                              f"{res['mb_per_s']:>8.2f} MB/s  peak {res['peak_rss_mb']} MB  "
+                              f"(파싱 {res['phases']['parse_sum']:.2f}s, 쓰기 {res['phases']['write_sum']:.2f}s)",
+                              flush=True)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        'meta': {'timestamp': datetime.now().isoformat(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpu_count': multiprocessing.cpu_count()},
+        'corpus': corpus_info,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    print(f'결과 저장: {args.output}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""clip_packing.py
+
+Pack many short clips into one Whisper window and split the transcript back.
+
+Every Whisper call pays for a full 30 s window, so a corpus of 0.5-3 s clips
+spends most of its time on padding and per-call overhead. pack_windows()
+groups consecutive clips into windows of at most WINDOW_SECONDS with a guard
+of silence between neighbours; build_window() concatenates them and records
+where each clip sits; split_segments() maps the segments Whisper returns for
+the window back onto the clips by those offsets. A segment that spans two
+clips can't be attributed safely, so the clips it touches are reported for a
+run on their own.
+"""
+
+WINDOW_SECONDS = 30.0
+SAMPLE_RATE = 16000
+# silence between packed clips; Whisper tends to end a segment in a gap this long
+GUARD_SECONDS = 1.0
+# overlap (s) with a second clip above which a segment counts as crossing
+CROSS_TOLERANCE = 0.2
+
+
+def pack_windows(durations, window: float = WINDOW_SECONDS, guard: float = GUARD_SECONDS):
+    """Group clip indices, in order, into windows whose clips plus guards fit in `window`.
+
+    Clips with an unknown (None) duration or longer than a window get a
+    window of their own.
+    """
+    windows, current, used = [], [], 0.0
+    for i, d in enumerate(durations):
+        if d is None or d + 2 * guard > window:
+            if current:
+                windows.append(current)
+                current, used = [], 0.0
+            windows.append([i])
+            continue
+        need = d + guard
+        if current and used + need + guard > window:
+            windows.append(current)
+            current, used = [], 0.0
+        current.append(i)
+        used += need
+    if current:
+        windows.append(current)
+    return windows
+
+
+def build_window(clips, guard: float = GUARD_SECONDS):
+    """Concatenate 16 kHz float32 `clips` with leading/between/trailing guards.
+
+    Returns (buffer, spans) with spans[i] = (start, end) of clip i in seconds.
+    """
+    import numpy as np
+    gap = np.zeros(int(guard * SAMPLE_RATE), dtype=np.float32)
+    parts, spans = [gap], []
+    pos = len(gap)
+    for clip in clips:
+        spans.append((pos / SAMPLE_RATE, (pos + len(clip)) / SAMPLE_RATE))
+        parts += [np.asarray(clip, dtype=np.float32), gap]
+        pos += len(clip) + len(gap)
+    return np.concatenate(parts), spans
+
+
+def _overlap(a0, a1, b0, b1) -> float:
+    return max(0.0, min(a1, b1) - max(a0, b0))
+
+
+def split_segments(segments, spans, tolerance: float = CROSS_TOLERANCE):
+    """Assign window `segments` (dicts with start, end, text) to the clips at `spans`.
+
+    Returns (per_clip, rerun): per_clip[i] lists clip i's segments with times
+    relative to the clip, rerun is the set of clip indices touched by a
+    segment that crosses into another clip. Segments lying only in the guard
+    silence are dropped.
+    """
+    per_clip = [[] for _ in spans]
+    rerun = set()
+    for seg in segments:
+        overlaps = [(_overlap(seg['start'], seg['end'], s0, s1), i) for i, (s0, s1) in enumerate(spans)]
+        touched = [i for ov, i in overlaps if ov > tolerance]
+        if len(touched) > 1:
+            rerun.update(touched)
+            continue
+        best, i = max(overlaps)
+        if best <= 0:
+            continue
+        s0, s1 = spans[i]
+        per_clip[i].append({'start': max(seg['start'], s0) - s0,
+                            'end': min(seg['end'], s1) - s0,
+                            'text': seg['text']})
+    return per_clip, rerun
@@ -0,0 +1,197 @@
+"""content_store.py
+
+Content-addressed deduplication of extracted audio.
+
+The same WEM payload often appears in many PCKs and patch layers. When
+unpacking with a store, every payload is hashed (BLAKE2b); the first copy is
+written normally and becomes the canonical file, later copies are hard links
+to it (or plain copies where hard links aren't possible). Every written path is
+recorded with its hash so convert_wem.py / transcribe.py can process each
+unique payload once and fan the result out to the other locations.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+STORE_NAME = 'content_store.sqlite'
+
+# Batch commits; other workers may miss a very recent canonical copy and write
+# their own, which only costs disk space.
+COMMIT_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_hash ON files (hash);
+CREATE INDEX IF NOT EXISTS idx_payloads_path ON payloads (path);
+"""
+
+
+def content_hash(data) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def link_or_copy(src, dst) -> bool:
+    """Hard link `dst` to `src`, copying when linking isn't possible. True if linked."""
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if dst.exists():
+            dst.unlink()
+        os.link(src, dst)
+        return True
+    except OSError:
+        shutil.copyfile(src, dst)
+        return False
+
+
+class ContentStore:
+    """One connection to the store database (open one per worker)."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # used from the unpack writer thread, never concurrently
+        self._conn = sqlite3.connect(str(self.db_path), timeout=60, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._upgrade()
+        self._pending = 0
+        self.linked = 0
+        self.saved_bytes = 0
+
+    def _upgrade(self):
+        """Add the mtime column to a store created by an older version (its rows get re-hashed once)."""
+        have = {r[1] for r in self._conn.execute('PRAGMA table_info(payloads)')}
+        if 'mtime_ns' not in have:
+            with self._conn:
+                self._conn.execute('ALTER TABLE payloads ADD COLUMN mtime_ns INTEGER')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _matches(self, path, digest: str, size: int, mtime_ns=None) -> bool:
+        """True if `path` still holds the payload `digest` (files can change behind the store).
+
+        An unchanged size and mtime is trusted; only a changed (or unknown)
+        mtime makes the file be read and hashed again.
+        """
+        try:
+            st = os.stat(path)
+            if st.st_size != size:
+                return False
+            if st.st_mtime_ns == mtime_ns:
+                return True
+            with open(path, 'rb') as fh:
+                if content_hash(fh.read()) != digest:
+                    return False
+        except OSError:
+            return False
+        # same content, touched: remember the new mtime so the next hit doesn't hash
+        self._conn.execute('UPDATE payloads SET mtime_ns = ? WHERE hash = ? AND path = ?',
+                           (st.st_mtime_ns, digest, path))
+        return True
+
+    def _release(self, dest: str, digest: str):
+        """`dest` is about to hold `digest`: stop using it as the canonical copy of any other payload.
+
+        Another file still holding the old payload takes over, so later
+        copies are never linked to the rewritten file.
+        """
+        rows = self._conn.execute('SELECT hash, size FROM payloads WHERE path = ? AND hash != ?',
+                                  (dest, digest)).fetchall()
+        for old_hash, size in rows:
+            self._conn.execute('DELETE FROM payloads WHERE hash = ?', (old_hash,))
+            others = self._conn.execute('SELECT path FROM files WHERE hash = ? AND path != ?', (old_hash, dest))
+            for (other,) in others.fetchall():
+                if self._matches(other, old_hash, size):
+                    self._conn.execute('INSERT INTO payloads (hash, path, size, mtime_ns) VALUES (?, ?, ?, ?)',
+                                       (old_hash, other, size, os.stat(other).st_mtime_ns))
+                    break
+
+    def write(self, path: Path, data):
+        """Write `data` to `path`, linking to an existing identical payload if known."""
+        digest = content_hash(data)
+        dest = str(Path(path).resolve())
+        self._release(dest, digest)
+        row = self._conn.execute('SELECT path, mtime_ns FROM payloads WHERE hash = ?', (digest,)).fetchone()
+        canonical = row is not None and (row[0] == dest or self._matches(row[0], digest, len(data), row[1]))
+        linked = False
+        if canonical and row[0] != dest:
+            try:
+                linked = link_or_copy(row[0], dest)
+            except OSError:
+                linked = False
+        if linked:
+            self.linked += 1
+            self.saved_bytes += len(data)
+        else:
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            if os.path.exists(dest):
+                # never write through an existing hard link into another copy
+                os.unlink(dest)
+            with open(dest, 'wb') as fh:
+                fh.write(data)
+            if not canonical or row[0] == dest:
+                # no usable copy yet (or the recorded one changed on disk): this file becomes it
+                self._conn.execute('INSERT OR REPLACE INTO payloads (hash, path, size, mtime_ns) VALUES (?, ?, ?, ?)',
+                                   (digest, dest, len(data), os.stat(dest).st_mtime_ns))
+        self._conn.execute('INSERT OR REPLACE INTO files (path, hash) VALUES (?, ?)', (dest, digest))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+
+def group_duplicates(db_path, paths, key=None):
+    """Split `paths` into (unique, fan_out) using the store's hash table.
+
+    `key(path)` maps a path to the extracted file whose hash identifies it
+    (e.g. the .wem a .wav was converted from); default is the path itself.
+    Returns `unique` (one representative per payload plus paths the store
+    doesn't know) and `fan_out` = {representative: [duplicate paths]}.
+    """
+    key = key or (lambda p: p)
+    conn = sqlite3.connect(str(db_path), timeout=60)
+    try:
+        hashes = dict(conn.execute('SELECT path, hash FROM files'))
+    finally:
+        conn.close()
+
+    unique = []
+    fan_out = {}
+    rep_for_hash = {}
+    for p in paths:
+        digest = hashes.get(str(Path(key(p)).resolve()))
+        if digest is None:
+            unique.append(p)
+            continue
+        rep = rep_for_hash.get(digest)
+        if rep is None:
+            rep_for_hash[digest] = p
+            unique.append(p)
+        else:
+            fan_out.setdefault(rep, []).append(p)
+    return unique, fan_out
@@ -5,11 +5,22 @@ Recursive .wem -> .wav converter using a local vgmstream package.
 Usage examples:
   python app/convert_wem.py --input input
   python app/convert_wem.py --input input --site-packages runtime\Lib\site-packages --overwrite
+  python app/convert_wem.py --input input --workers 4 --cli-batch-size 64
+  python app/convert_wem.py --input input --workers 8 --async --timeout 120
+  python app/convert_wem.py --input input --target whisper --format flac
 
 The script will search the given input directory recursively for .wem files
 and attempt to convert each to a .wav placed in the same directory.
 It will try to import a `vgmstream` module from the provided
 `--site-packages` path and use any available convert/decode function.
+The function that works is found once and cached in cache/vgmstream_backend.json
+per vgmstream version, so later runs and worker processes call it directly.
+
+Backends are tried in order: the built-in PCM / IMA ADPCM decoder
+(native_decoder), libvgmstream in-process, the vgmstream module, one
+vgmstream CLI process per file (or per batch with --cli-batch-size).
+With --async, CLI processes are run from one event loop (async_convert)
+instead of a pool of Python worker processes.
 """
 
 import argparse
@@ -17,11 +28,42 @@ import os
 import sys
 import subprocess
 import inspect
-import multiprocessing
+import itertools
+import json
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 
+from scheduler import BudgetScheduler, parse_size
+from native_decoder import can_decode, decode_wem, probe_file
+from vgmstream_lib import load_library
+from audio_prep import WHISPER_RATE, flac_available, parse_wav, read_wav, require_numpy, to_whisper, write_audio
+
 VERBOSE = True
 _VGMSTREAM_MODULE = None
+# (function name, 'in_out' | 'in_bytes') once resolved in this process; False if none works
+_MODULE_BACKEND = None
+# files a probe must fail on before the module is given up (one may just be corrupt)
+PROBE_ATTEMPTS = 3
+_PROBE_FAILURES = 0
+# (exe, cwd, argv template) once discovered in this process; False if none works
+_CLI = None
+# explicit libvgmstream path from --libvgmstream (default: search site-packages / system)
+LIBVGMSTREAM_PATH = None
+# decode PCM / IMA ADPCM with the built-in decoder (--no-native turns it off)
+NATIVE = True
+# 'full' keeps the decoded format; 'whisper' writes 16 kHz mono 16-bit (--target)
+TARGET = 'full'
+OUTPUT_EXT = '.wav'
+BACKEND_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache',
+                             'vgmstream_backend.json')
+
+RETRY_LIST_NAME = 'convert_failed.txt'
+
+# Decoded PCM is roughly this many times larger than a (Vorbis) .wem; used
+# to estimate per-file memory for --memory-budget.
+DECODE_EXPANSION = 12
 
 
 def find_wem_files(root: str):
@@ -68,57 +110,153 @@ def try_import_vgmstream(site_packages: Optional[str]):
         return None
 
 
-def decode_with_vgmstream_module(vgm, in_path: str, out_path: str):
-    # Try a few likely function names and signatures.
-    candidates = []
-    for name, obj in inspect.getmembers(vgm, inspect.isroutine):
-        candidates.append((name, obj))
-
-    # Prefer functions that accept (infile, outfile)
-    for name, func in candidates:
-        try:
-            sig = inspect.signature(func)
-            params = list(sig.parameters.values())
-            if len(params) >= 2:
-                # try calling it with (in_path, out_path)
-                try:
-                    if VERBOSE:
-                        print(f"[디버그] 시도: {vgm.__name__}.{name}(in, out)")
-                    res = func(in_path, out_path)
-                    # If it returns True or None it's likely successful.
-                    if VERBOSE:
-                        print(f"[정보] 호출됨: {vgm.__name__}.{name} -> {in_path}")
-                    return 'module'
-                except TypeError:
-                    continue
-                except Exception:
-                    # continue trying other candidates
-                    continue
-        except (ValueError, TypeError):
-            continue
-
-    # If no candidate accepted (in,out) signature, try functions that return raw PCM bytes
-    for name, func in candidates:
+def vgmstream_version(vgm) -> str:
+    """Cache key for the resolved backend: module version plus location."""
+    version = getattr(vgm, '__version__', None)
+    if not version:
         try:
-            sig = inspect.signature(func)
-            if len(sig.parameters) == 1:
-                try:
-                    if VERBOSE:
-                        print(f"[디버그] 시도: {vgm.__name__}.{name}(in) -> bytes")
-                    data = func(in_path)
-                    if isinstance(data, (bytes, bytearray)):
-                        with open(out_path, 'wb') as f:
-                            f.write(data)
-                        return 'module'
-                except Exception:
-                    continue
+            from importlib import metadata
+            version = metadata.version('vgmstream')
         except Exception:
-            continue
+            version = 'unknown'
+    where = getattr(vgm, '__file__', None) or list(getattr(vgm, '__path__', None) or [])
+    return f"{version}|{where}"
+
+
+def _load_backend_cache() -> dict:
+    try:
+        with open(BACKEND_CACHE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_backend_cache(key: str, backend):
+    data = _load_backend_cache()
+    data[key] = {'function': backend[0], 'call': backend[1]}
+    try:
+        os.makedirs(os.path.dirname(BACKEND_CACHE), exist_ok=True)
+        tmp = BACKEND_CACHE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, BACKEND_CACHE)
+    except OSError as e:
+        if VERBOSE:
+            print(f"[디버그] 백엔드 캐시 저장 실패: {e}")
+
+
+def _call_module_backend(vgm, backend, in_path: str, out_path: str) -> bool:
+    name, call = backend
+    func = getattr(vgm, name)
+    if call == 'in_out':
+        func(in_path, out_path)
+    else:
+        data = func(in_path)
+        if not isinstance(data, (bytes, bytearray)):
+            return False
+        with open(out_path, 'wb') as f:
+            f.write(data)
+    return os.path.exists(out_path)
+
+
+def probe_module_backend(vgm, in_path: str, out_path: str):
+    """Try the module's routines on one file; return (name, call) of the first that works."""
+    candidates = inspect.getmembers(vgm, inspect.isroutine)
+
+    # Prefer functions that accept (infile, outfile), then ones returning raw bytes
+    for call in ('in_out', 'in_bytes'):
+        for name, func in candidates:
+            try:
+                params = len(inspect.signature(func).parameters)
+            except (ValueError, TypeError):
+                continue
+            if not (params >= 2 if call == 'in_out' else params == 1):
+                continue
+            if VERBOSE:
+                print(f"[디버그] 시도: {vgm.__name__}.{name}({'in, out' if call == 'in_out' else 'in'})")
+            try:
+                if _call_module_backend(vgm, (name, call), in_path, out_path):
+                    return name, call
+            except Exception:
+                continue
+    return None
+
 
+def resolve_module_backend(vgm, in_path: str = None, out_path: str = None):
+    """Return the working (name, call) for this process, False if there is none, or None if undecided.
+
+    Looks in memory, then in the on-disk cache for this vgmstream version, and
+    only then probes with `in_path` (returns None if there is nothing to probe
+    with yet). A found backend is saved to the cache. A failed probe may just
+    mean a bad file, so the next file probes again; only after PROBE_ATTEMPTS
+    failed files is the module given up for this process.
+    """
+    global _MODULE_BACKEND, _PROBE_FAILURES
+    if _MODULE_BACKEND is not None:
+        return _MODULE_BACKEND
+    key = vgmstream_version(vgm)
+    entry = _load_backend_cache().get(key)
+    if entry and callable(getattr(vgm, entry.get('function') or '', None)):
+        _MODULE_BACKEND = (entry['function'], entry.get('call', 'in_out'))
+        return _MODULE_BACKEND
+    if in_path is None:
+        return None
+    backend = probe_module_backend(vgm, in_path, out_path)
+    if backend:
+        _save_backend_cache(key, backend)
+        _MODULE_BACKEND = backend
+        return backend
+    _PROBE_FAILURES += 1
+    if _PROBE_FAILURES >= PROBE_ATTEMPTS:
+        _MODULE_BACKEND = False
+        return False
     return None
 
 
-def decode_with_cli_tool(in_path: str, out_path: str, site_packages: Optional[str]):
+def decode_with_vgmstream_module(vgm, in_path: str, out_path: str):
+    backend = resolve_module_backend(vgm, in_path, out_path)
+    if not backend:
+        return None
+    try:
+        if _call_module_backend(vgm, backend, in_path, out_path):
+            return 'module'
+    except Exception as e:
+        if VERBOSE:
+            print(f"[디버그] {vgm.__name__}.{backend[0]} 실패: {e}")
+    return None
+
+
+def report_module_backend(site_packages: Optional[str], samples):
+    """Resolve the module backend once at startup and print how long it took.
+
+    Probes with up to PROBE_ATTEMPTS of `samples` (files vgmstream is needed
+    for), so one corrupt or unsupported file doesn't disable the module.
+    """
+    start = time.perf_counter()
+    vgm = try_import_vgmstream(site_packages)
+    if vgm is None:
+        return False
+    cached = _MODULE_BACKEND is not None or vgmstream_version(vgm) in _load_backend_cache()
+    backend = resolve_module_backend(vgm)
+    if backend is None:
+        probes = (w for w in samples if not native_decodable(w))
+        with tempfile.TemporaryDirectory() as tmp:
+            for sample in itertools.islice(probes, PROBE_ATTEMPTS):
+                backend = resolve_module_backend(vgm, sample, os.path.join(tmp, 'probe.wav'))
+                if backend is not None:
+                    break
+    elapsed = time.perf_counter() - start
+    if VERBOSE:
+        if backend:
+            source = '캐시' if cached else '탐색'
+            print(f"[정보] vgmstream 모듈 백엔드: {vgm.__name__}.{backend[0]} ({backend[1]}, {source}, {elapsed:.2f}초)")
+        else:
+            print(f"[정보] vgmstream 모듈 백엔드 없음, CLI 사용 ({elapsed:.2f}초)")
+    return backend
+
+
+def cli_candidates(site_packages: Optional[str]):
     # Try to find a vgmstream CLI in the site_packages or in PATH
     candidates = []
     if site_packages:
@@ -128,46 +266,240 @@ def decode_with_cli_tool(in_path: str, out_path: str, site_packages: Optional[st
         # also check inside a vgmstream subfolder (where bundled exe and DLLs often live)
         candidates.append(os.path.join(site_packages, 'vgmstream', 'vgmstream-cli.exe'))
         candidates.append(os.path.join(site_packages, 'vgmstream', 'vgmstream.exe'))
-    # fallback to just 'vgmstream' in PATH
+    # fallback to a CLI in PATH
+    candidates.append('vgmstream-cli')
     candidates.append('vgmstream')
-
-    for cmd in candidates:
+    return candidates
+
+
+def discover_cli(site_packages: Optional[str]):
+    """Find a working vgmstream CLI once; returns (exe, cwd, argv template) or False."""
+    global _CLI
+    if _CLI is not None:
+        return _CLI
+    _CLI = False
+    for cmd in cli_candidates(site_packages):
+        work_dir = None
+        if os.path.isabs(cmd) or os.path.sep in str(cmd):
+            if not os.path.isfile(cmd):
+                continue
+            # run from the exe's folder so bundled DLLs are resolved
+            work_dir = os.path.dirname(cmd)
         try:
-            # If cmd is a path to an exe, set cwd to its directory so DLLs are resolved
-            work_dir = None
-            exe = cmd
-            if os.path.isabs(cmd) or os.path.sep in str(cmd):
-                if os.path.exists(cmd):
-                    work_dir = os.path.dirname(cmd)
-                    exe = cmd
-
-            # Use absolute paths for input/output so cwd doesn't affect file lookup
-            abs_in = os.path.abspath(in_path)
-            abs_out = os.path.abspath(out_path)
-
-            # Some CLIs accept: vgmstream -o out.wav in.wem  (others: vgmstream in.wem out.wav)
-            try_cmds = [ [exe, '-o', abs_out, abs_in], [exe, abs_in, abs_out] ]
-            for tc in try_cmds:
-                proc = subprocess.run(tc, check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=work_dir)
-                if proc.returncode == 0 and os.path.exists(abs_out):
-                    return exe
-                else:
-                    if VERBOSE:
-                        out = proc.stdout.decode(errors='ignore')
-                        err = proc.stderr.decode(errors='ignore')
-                        print(f"[디버그] CLI {exe} 종료 코드: {proc.returncode}")
-                        if out:
-                            print(f"[디버그] 표준출력:\n{out}")
-                        if err:
-                            print(f"[디버그] 표준에러:\n{err}")
-        except FileNotFoundError:
+            proc = subprocess.run([cmd, '-h'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=work_dir,
+                                  timeout=15)
+        except (OSError, subprocess.TimeoutExpired):
             continue
-        except Exception:
+        text = (proc.stdout + proc.stderr).decode(errors='ignore')
+        # any tool prints "usage"; only accept a binary that names itself vgmstream
+        if 'vgmstream' not in text.lower():
+            if VERBOSE:
+                print(f"[디버그] vgmstream CLI 아님: {cmd}")
             continue
+        # vgmstream-cli takes `-o <outfile> <infile>`; very old builds take `<in> <out>`
+        template = ['-o', '{out}', '{in}'] if '-o' in text else ['{in}', '{out}']
+        _CLI = (cmd, work_dir, template)
+        break
+    return _CLI
+
 
+def decode_with_cli_tool(in_path: str, out_path: str, site_packages: Optional[str]):
+    cli = discover_cli(site_packages)
+    if not cli:
+        return None
+    exe, work_dir, template = cli
+    # Use absolute paths for input/output so cwd doesn't affect file lookup
+    paths = {'{in}': os.path.abspath(in_path), '{out}': os.path.abspath(out_path)}
+    try:
+        proc = subprocess.run([exe] + [paths.get(a, a) for a in template], check=False,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=work_dir)
+    except OSError as e:
+        if VERBOSE:
+            print(f"[디버그] CLI {exe} 실행 실패: {e}")
+        return None
+    if proc.returncode == 0 and os.path.exists(out_path):
+        return exe
+    if VERBOSE:
+        out = proc.stdout.decode(errors='ignore')
+        err = proc.stderr.decode(errors='ignore')
+        print(f"[디버그] CLI {exe} 종료 코드: {proc.returncode}")
+        if out:
+            print(f"[디버그] 표준출력:\n{out}")
+        if err:
+            print(f"[디버그] 표준에러:\n{err}")
     return None
 
 
+def report_cli(site_packages: Optional[str]):
+    """Discover the CLI at startup and log which executable and arguments are used."""
+    start = time.perf_counter()
+    cli = discover_cli(site_packages)
+    elapsed = time.perf_counter() - start
+    if VERBOSE:
+        if cli:
+            args = ' '.join({'{in}': '<입력>', '{out}': '<출력>'}.get(a, a) for a in cli[2])
+            print(f"[정보] vgmstream CLI: {cli[0]} {args} ({elapsed:.2f}초)")
+        else:
+            print(f"[정보] 사용 가능한 vgmstream CLI 없음 ({elapsed:.2f}초)")
+    return cli
+
+
+def native_decodable(in_path: str) -> bool:
+    if not NATIVE:
+        return False
+    try:
+        return can_decode(probe_file(in_path))
+    except Exception:
+        return False
+
+
+def file_size(path: str) -> int:
+    """Size of `path`, 0 if it is gone (it then fails in its own conversion, not while scheduling)."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def output_path(wem: str) -> str:
+    return os.path.splitext(wem)[0] + OUTPUT_EXT
+
+
+def write_output(out_path: str, audio):
+    """Write decoded audio in the selected target format (.wav or .flac by extension)."""
+    if TARGET == 'whisper':
+        audio = to_whisper(audio)
+    write_audio(out_path, audio)
+
+
+def finish_decoded(decoded_wav: str, out_path: str):
+    """Turn a .wav written by vgmstream into the selected target format at `out_path`."""
+    if TARGET == 'full' and decoded_wav == out_path:
+        return
+    write_output(out_path, read_wav(decoded_wav))
+    if decoded_wav != out_path:
+        os.remove(decoded_wav)
+
+
+def decode_with_native(in_path: str, out_path: str):
+    """PCM / IMA ADPCM .wem -> output file without vgmstream; None for other codecs."""
+    if not native_decodable(in_path):
+        return None
+    try:
+        write_output(out_path, decode_wem(in_path))
+    except Exception as e:
+        if VERBOSE:
+            print(f"[디버그] 내장 디코더 실패: {e}")
+        return None
+    return 'native'
+
+
+def decode_with_library(in_path: str, out_path: str, site_packages: Optional[str]):
+    """Decode in-process through libvgmstream and write the .wav ourselves."""
+    lib = load_library(site_packages, LIBVGMSTREAM_PATH)
+    if not lib:
+        return None
+    try:
+        write_output(out_path, lib.decode(in_path))
+    except Exception as e:
+        if VERBOSE:
+            print(f"[디버그] libvgmstream 디코드 실패: {e}")
+        return None
+    return 'library'
+
+
+def report_library(site_packages: Optional[str]):
+    """Load libvgmstream at startup and log which one is used."""
+    start = time.perf_counter()
+    lib = load_library(site_packages, LIBVGMSTREAM_PATH)
+    if VERBOSE:
+        if lib:
+            print(f"[정보] libvgmstream: {lib.path} (API v{lib.api}, {time.perf_counter() - start:.2f}초)")
+        else:
+            print("[정보] libvgmstream 없음, vgmstream 모듈/CLI 사용")
+    return lib
+
+
+def decode_with_vgmstream(in_path: str, out_path: str, site_packages: Optional[str]):
+    """Decode through the vgmstream module, else one CLI spawn, into the target format."""
+    direct = TARGET == 'full' and out_path.lower().endswith('.wav')
+    decoded = out_path if direct else os.path.splitext(out_path)[0] + '.decoded.wav'
+    backend = None
+    try:
+        vgm = try_import_vgmstream(site_packages)
+        if vgm:
+            try:
+                backend = decode_with_vgmstream_module(vgm, in_path, decoded)
+            except Exception as e:
+                if VERBOSE:
+                    print(f"[디버그] vgmstream 모듈 디코드 예외: {e}")
+        if not backend:
+            backend = decode_with_cli_tool(in_path, decoded, site_packages)
+        if backend and not direct:
+            finish_decoded(decoded, out_path)
+    except Exception as e:
+        if VERBOSE:
+            print(f"[디버그] 출력 변환 실패: {e}")
+        backend = None
+    finally:
+        if not direct and os.path.exists(decoded):
+            os.remove(decoded)
+    return backend
+
+
+def decode_to_audio(in_path: str, site_packages: Optional[str]):
+    """Decode `in_path` into memory (PcmAudio) without writing a .wav next to it.
+
+    Same backend order as the converter; the CLI streams its WAV to stdout
+    (-p) and the module, which only writes files, uses a temporary file.
+    Raises RuntimeError when every backend fails.
+    """
+    if native_decodable(in_path):
+        return decode_wem(in_path)
+    lib = load_library(site_packages, LIBVGMSTREAM_PATH)
+    if lib:
+        try:
+            return lib.decode(in_path)
+        except Exception as e:
+            if VERBOSE:
+                print(f"[디버그] libvgmstream 디코드 실패: {e}")
+    vgm = try_import_vgmstream(site_packages)
+    if vgm:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, 'decoded.wav')
+            try:
+                if decode_with_vgmstream_module(vgm, in_path, out):
+                    return read_wav(out)
+            except Exception as e:
+                if VERBOSE:
+                    print(f"[디버그] vgmstream 모듈 디코드 예외: {e}")
+    cli = discover_cli(site_packages)
+    if cli and cli[2][0] == '-o':
+        exe, work_dir, _ = cli
+        try:
+            proc = subprocess.run([exe, '-p', os.path.abspath(in_path)], check=False, stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, cwd=work_dir)
+            if proc.returncode == 0 and proc.stdout[:4] == b'RIFF':
+                return parse_wav(proc.stdout)
+        except Exception as e:
+            if VERBOSE:
+                print(f"[디버그] CLI 디코드 실패: {e}")
+    raise RuntimeError(f'디코드 실패: {in_path}')
+
+
+def worker_settings(cli) -> dict:
+    """Module settings a pool worker needs (spawned workers don't inherit them)."""
+    return {'_CLI': cli, 'LIBVGMSTREAM_PATH': LIBVGMSTREAM_PATH, 'NATIVE': NATIVE, 'TARGET': TARGET,
+            'OUTPUT_EXT': OUTPUT_EXT, 'VERBOSE': VERBOSE,
+            # the startup probe's outcome, including "no module routine works" (never cached on disk)
+            '_MODULE_BACKEND': _MODULE_BACKEND, '_PROBE_FAILURES': _PROBE_FAILURES}
+
+
+def _init_worker(settings: dict):
+    """Process pool initializer: reuse the backend choices of the parent."""
+    globals().update(settings)
+
+
 def convert_wem_to_wav(in_path: str, out_path: str, site_packages: Optional[str], overwrite: bool=False, idx: int = None, total: int = None) -> bool:
     # print skip if exists
     if os.path.exists(out_path) and not overwrite:
@@ -185,24 +517,13 @@ def convert_wem_to_wav(in_path: str, out_path: str, site_packages: Optional[str]
         else:
             print(f"[정보] 변환 시작: {in_path} -> {out_path}")
 
-    vgm = try_import_vgmstream(site_packages)
-    if vgm:
-        try:
-            backend = decode_with_vgmstream_module(vgm, in_path, out_path)
-            if backend and os.path.exists(out_path):
-                if VERBOSE:
-                    if idx and total:
-                        print(f"[정보] [{idx}/{total}] 변환 완료: {in_path} -> {out_path}")
-                    else:
-                        print(f"[정보] 변환 완료: {in_path} -> {out_path}")
-                return True
-        except Exception as e:
-            if VERBOSE:
-                print(f"[디버그] vgmstream 모듈 디코드 예외: {e}")
-
-    # fallback to CLI invocation
-    backend = decode_with_cli_tool(in_path, out_path, site_packages)
-    if backend:
+    # built-in PCM/ADPCM decoder, then the in-process library, the python module, one CLI spawn
+    backend = decode_with_native(in_path, out_path)
+    if not backend:
+        backend = decode_with_library(in_path, out_path, site_packages)
+    if not backend:
+        backend = decode_with_vgmstream(in_path, out_path, site_packages)
+    if backend and os.path.exists(out_path):
         if VERBOSE:
             if idx and total:
                 print(f"[정보] [{idx}/{total}] 변환 완료: {in_path} -> {out_path}")
@@ -219,6 +540,256 @@ def convert_wem_to_wav(in_path: str, out_path: str, site_packages: Optional[str]
     return False
 
 
+def fan_out_wav(wem: str, out_wav: str, fan_out: dict, overwrite: bool=False):
+    """Link the converted `out_wav` next to every duplicate of `wem`."""
+    dups = fan_out.get(wem)
+    if not dups or not os.path.exists(out_wav):
+        return
+    from content_store import link_or_copy
+    for dup in dups:
+        dup_wav = output_path(dup)
+        if os.path.exists(dup_wav) and not overwrite:
+            continue
+        try:
+            link_or_copy(out_wav, dup_wav)
+        except OSError as e:
+            print(f"[오류] 중복 결과 링크 실패: {dup_wav}: {e}", file=sys.stderr)
+
+
+def _batch_output(wem: str, started: float):
+    """Return the output for `wem` from a batch run (vgmstream's .wav renamed to <stem>.wav and
+    converted to the target format), or None."""
+    out_wav = os.path.splitext(wem)[0] + '.wav'
+    # ?f is the input name; depending on the build it keeps the .wem extension
+    for produced in (out_wav, wem + '.wav'):
+        try:
+            if os.path.getmtime(produced) >= started - 2:
+                if produced != out_wav:
+                    os.replace(produced, out_wav)
+                finish_decoded(out_wav, output_path(wem))
+                return output_path(wem)
+        except Exception:
+            continue
+    return None
+
+
+def convert_batch_with_cli(wems, site_packages: Optional[str], overwrite: bool = False):
+    """Decode `wems` (all in one folder) with a single vgmstream CLI process.
+
+    Returns [(wem, ok), ...]; ok is judged per file from the outputs so the
+    failures can be retried one by one.
+    """
+    cli = discover_cli(site_packages)
+    todo = [w for w in wems if overwrite or not os.path.exists(output_path(w))]
+    pending = set(todo)
+    results = [(w, True) for w in wems if w not in pending]
+    if not todo:
+        return results
+    if not cli or cli[2][0] != '-o':
+        return results + [(w, False) for w in todo]
+    # run inside the folder with bare names so ?f-based outputs land next to the inputs
+    folder = os.path.dirname(os.path.abspath(todo[0]))
+    argv = [os.path.abspath(cli[0]) if cli[1] else cli[0], '-o', '?f.wav'] + [os.path.basename(w) for w in todo]
+    started = time.time()
+    try:
+        proc = subprocess.run(argv, check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=folder)
+        if VERBOSE and proc.returncode != 0:
+            print(f"[디버그] CLI 일괄 변환 종료 코드: {proc.returncode} ({folder})")
+    except OSError as e:
+        if VERBOSE:
+            print(f"[디버그] CLI 일괄 실행 실패: {e}")
+        return results + [(w, False) for w in todo]
+    results += [(w, _batch_output(w, started) is not None) for w in todo]
+    if VERBOSE:
+        ok = sum(1 for w, done in results if done)
+        print(f"[정보] 일괄 변환: {ok}/{len(wems)} ({folder})")
+    return results
+
+
+def make_batches(wems, batch_size: int):
+    """Group files by folder into lists of at most `batch_size`."""
+    by_dir = {}
+    for wem in wems:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(wem)), []).append(wem)
+    batches = []
+    for files in by_dir.values():
+        for i in range(0, len(files), batch_size):
+            batches.append(files[i:i + batch_size])
+    return batches
+
+
+class ConvertProgress:
+    """Success/failure counts and files/s, printed as results arrive (at most every 0.5 s)."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.ok = 0
+        self.failed = []
+        self._start = time.perf_counter()
+        self._last = 0.0
+
+    def add(self, wem: str, ok: bool):
+        if ok:
+            self.ok += 1
+        else:
+            self.failed.append(wem)
+
+    def report(self, force: bool = False):
+        now = time.perf_counter()
+        if not VERBOSE or (not force and now - self._last < 0.5):
+            return
+        self._last = now
+        done = self.ok + len(self.failed)
+        rate = done / max(now - self._start, 1e-9)
+        print(f"[진행] {done}/{self.total} 완료 (성공 {self.ok}, 실패 {len(self.failed)}), {rate:.1f} 파일/초",
+              flush=True)
+
+
+def convert_chunk(tasks):
+    """Pool task: convert several files in one round trip; returns [(wem, ok), ...]."""
+    results = []
+    for task in tasks:
+        try:
+            ok = convert_wem_to_wav(*task)
+        except Exception as e:
+            print(f"[오류] 변환 실패: {task[0]}: {e}", file=sys.stderr)
+            ok = False
+        results.append((task[0], ok))
+    return results
+
+
+def auto_chunksize(total: int, workers: int) -> int:
+    # several chunks per worker so the tail stays balanced; cap the IPC savings
+    return max(1, min(64, total // (workers * 8)))
+
+
+def make_chunks(tasks, sizes, chunksize: int, chunk_bytes: int):
+    """Split `tasks` (largest first) into chunks of at most `chunksize` files or about
+    `chunk_bytes`, so big files travel alone and small ones in groups."""
+    chunks = []
+    current, current_bytes = [], 0
+    for task, size in zip(tasks, sizes):
+        current.append(task)
+        current_bytes += size
+        if len(current) >= chunksize or current_bytes >= chunk_bytes:
+            chunks.append((current_bytes, current))
+            current, current_bytes = [], 0
+    if current:
+        chunks.append((current_bytes, current))
+    return chunks
+
+
+def convert_files(wems, site_packages: Optional[str], overwrite: bool, workers: int, cli, memory_budget, fan_out,
+                  chunksize: int = 0):
+    """Convert `wems` one file per call (built-in decoder, library, module or one CLI spawn).
+
+    Returns (success count, failed files). With several workers, files are sent
+    in chunks (`chunksize`, 0 = automatic) and results are counted as each
+    chunk finishes, in whatever order that happens.
+    """
+    total = len(wems)
+    progress = ConvertProgress(total)
+    if workers and workers > 1:
+        chunksize = chunksize or auto_chunksize(total, workers)
+        if VERBOSE:
+            print(f"[정보] 워커 프로세스 수: {workers}개, 묶음 크기 최대 {chunksize}개")
+            if memory_budget is not None:
+                print(f"[정보] 메모리 예산: {memory_budget / 1048576:.0f} MB (큰 파일부터 변환)")
+        # largest files first so a long decode doesn't run alone at the end
+        size_of = {w: file_size(w) for w in wems}
+        ordered = sorted(wems, key=size_of.get, reverse=True)
+        sizes = [size_of[w] for w in ordered]
+        tasks = [(wem, output_path(wem), site_packages, overwrite, idx, total)
+                 for idx, wem in enumerate(ordered, start=1)]
+        jobs = [(max(size_of[t[0]] for t in chunk) * DECODE_EXPANSION, chunk, convert_chunk, (chunk,))
+                for _, chunk in make_chunks(tasks, sizes, chunksize, max(1, sum(sizes) // (workers * 8)))]
+        scheduler = BudgetScheduler(workers, memory_budget)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(worker_settings(cli),)) as pool:
+            for chunk, fut in scheduler.run(pool, jobs):
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    # e.g. a worker process died
+                    print(f"[오류] 변환 작업 실패: {e}", file=sys.stderr)
+                    results = [(t[0], False) for t in chunk]
+                for wem, ok in results:
+                    progress.add(wem, ok)
+                    if ok:
+                        fan_out_wav(wem, output_path(wem), fan_out, overwrite)
+                progress.report()
+        progress.report(force=True)
+        if VERBOSE:
+            print(f"[정보] {scheduler.summary()}")
+    else:
+        for idx, wem in enumerate(wems, start=1):
+            out_wav = output_path(wem)
+            ok = convert_wem_to_wav(wem, out_wav, site_packages, overwrite=overwrite, idx=idx, total=total)
+            progress.add(wem, ok)
+            if ok:
+                fan_out_wav(wem, out_wav, fan_out, overwrite)
+            progress.report()
+        progress.report(force=True)
+    return progress.ok, progress.failed
+
+
+def read_retry_list(path: str):
+    """Files listed in a retry list that still exist."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and os.path.exists(line.strip())]
+    except OSError:
+        return []
+
+
+def write_retry_list(path: str, failed):
+    """Record failed files for --retry-failed; an empty list removes the file."""
+    if not failed:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(os.path.abspath(w) + '\n' for w in failed)
+
+
+def convert_batches(wems, site_packages: Optional[str], overwrite: bool, workers: int, cli, memory_budget, fan_out,
+                    batch_size: int):
+    """Convert `wems` with one CLI process per batch; returns (success count, failed files)."""
+    batches = make_batches(wems, batch_size)
+    if VERBOSE:
+        print(f"[정보] CLI 일괄 변환: {len(wems)}개 파일, 배치 {len(batches)}개 (최대 {batch_size}개씩)")
+    success = 0
+    failed = []
+
+    def collect(results):
+        nonlocal success
+        for wem, ok in results:
+            if ok:
+                success += 1
+                fan_out_wav(wem, output_path(wem), fan_out, overwrite)
+            else:
+                failed.append(wem)
+
+    if workers and workers > 1:
+        jobs = [(max(file_size(w) for w in b) * DECODE_EXPANSION, b, convert_batch_with_cli,
+                 (b, site_packages, overwrite)) for b in batches]
+        scheduler = BudgetScheduler(workers, memory_budget)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(worker_settings(cli),)) as pool:
+            for batch, fut in scheduler.run(pool, jobs):
+                try:
+                    collect(fut.result())
+                except Exception as e:
+                    print(f"[오류] 일괄 변환 실패: {e}", file=sys.stderr)
+                    failed.extend(batch)
+        if VERBOSE:
+            print(f"[정보] {scheduler.summary()}")
+    else:
+        for batch in batches:
+            collect(convert_batch_with_cli(batch, site_packages, overwrite))
+    return success, failed
+
+
 def main():
     parser = argparse.ArgumentParser(description='Convert .wem files to .wav using local vgmstream')
     parser.add_argument('--input', '-i', default='input', help='Input root directory to search')
@@ -227,11 +798,47 @@ def main():
     parser.add_argument('--overwrite', action='store_true', help='Overwrite existing .wav files')
     parser.add_argument('--quiet', action='store_true', help='Reduce logging output')
     parser.add_argument('--workers', '-w', type=int, default=1, help='Number of parallel worker processes (default 1)')
+    parser.add_argument('--dedup-db', default=None,
+                        help='content store written by unpack_pck.py --dedup; convert each unique payload once')
+    parser.add_argument('--memory-budget', default=None,
+                        help='cap on the estimated memory of files decoded at once, e.g. 1G (default: no cap)')
+    parser.add_argument('--libvgmstream', default=None,
+                        help='path to the libvgmstream shared library (default: search site-packages and system)')
+    parser.add_argument('--no-native', action='store_true',
+                        help='send PCM / IMA ADPCM files through vgmstream too instead of the built-in decoder')
+    parser.add_argument('--cli-batch-size', type=int, default=0,
+                        help='decode this many files per vgmstream CLI process (default 0: one process per file)')
+    parser.add_argument('--target', choices=['full', 'whisper'], default='full',
+                        help=f'full: keep the decoded format; whisper: {WHISPER_RATE} Hz mono 16-bit for transcribe.py')
+    parser.add_argument('--format', choices=['wav', 'flac'], default='wav',
+                        help='output container (flac needs the soundfile package)')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='files sent to a worker per task (default 0: automatic)')
+    parser.add_argument('--retry-list', default=None,
+                        help=f'where failed files are listed (default: <input>/{RETRY_LIST_NAME})')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='only convert the files listed in the retry list of a previous run')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='run up to --workers vgmstream CLI processes from one event loop instead of worker processes')
+    parser.add_argument('--timeout', type=float, default=300,
+                        help='with --async, kill a vgmstream process after this many seconds (default 300, 0: no limit)')
     args = parser.parse_args()
 
-    global VERBOSE
+    global VERBOSE, LIBVGMSTREAM_PATH, NATIVE, TARGET, OUTPUT_EXT
     if args.quiet:
         VERBOSE = False
+    LIBVGMSTREAM_PATH = args.libvgmstream
+    NATIVE = not args.no_native
+    TARGET = args.target
+    OUTPUT_EXT = '.' + args.format
+    try:
+        if TARGET == 'whisper' or args.format == 'flac':
+            require_numpy()
+        if args.format == 'flac' and not flac_available():
+            raise RuntimeError('FLAC 출력에는 soundfile 패키지가 필요합니다 (pip install soundfile)')
+    except RuntimeError as e:
+        print(f"[오류] {e}", file=sys.stderr)
+        sys.exit(2)
 
     root = args.input
     site_packages = args.site_packages
@@ -241,29 +848,77 @@ def main():
     if not os.path.isdir(root):
         print(f"[오류] 입력 디렉터리가 존재하지 않습니다: {root}", file=sys.stderr)
         sys.exit(2)
+    try:
+        memory_budget = parse_size(args.memory_budget)
+    except ValueError as e:
+        print(f"[오류] {e}", file=sys.stderr)
+        sys.exit(2)
 
-    wems = list(find_wem_files(root))
-    total = len(wems)
-    success = 0
-
-    if args.workers and args.workers > 1:
+    retry_list = args.retry_list or os.path.join(root, RETRY_LIST_NAME)
+    if args.retry_failed:
+        wems = read_retry_list(retry_list)
         if VERBOSE:
-            print(f"[정보] 워커 프로세스 수: {args.workers}개")
-        # ensure VERBOSE is visible to child processes
-        VERBOSE_CHILD = VERBOSE
-        tasks = [(wem, os.path.splitext(wem)[0] + '.wav', site_packages, args.overwrite, idx, total) for idx, wem in enumerate(wems, start=1)]
-        with multiprocessing.Pool(processes=args.workers) as pool:
-            for ok in pool.starmap(convert_wem_to_wav, tasks):
-                if ok:
-                    success += 1
+            print(f"[정보] 재시도 목록: {retry_list} ({len(wems)}개)")
     else:
-        for idx, wem in enumerate(wems, start=1):
-            out_wav = os.path.splitext(wem)[0] + '.wav'
-            if convert_wem_to_wav(wem, out_wav, site_packages, overwrite=args.overwrite, idx=idx, total=total):
-                success += 1
+        wems = list(find_wem_files(root))
+    fan_out = {}
+    if args.dedup_db and os.path.exists(args.dedup_db):
+        from content_store import group_duplicates
+        wems, fan_out = group_duplicates(args.dedup_db, wems)
+        if VERBOSE:
+            dup_count = sum(len(v) for v in fan_out.values())
+            print(f"[정보] 중복 제거: 고유 {len(wems)}개 변환, 중복 {dup_count}개는 결과를 링크")
+    total = len(wems)
+    # find the working vgmstream function and CLI once, before any worker starts
+    cli = lib = None
+    if wems:
+        lib = report_library(site_packages)
+        module_backend = report_module_backend(site_packages, wems)
+        cli = report_cli(site_packages)
+        if not lib and not module_backend and not cli:
+            if not NATIVE:
+                print("[오류] libvgmstream, vgmstream 모듈, CLI를 모두 사용할 수 없습니다. --site-packages 경로를 확인하세요.",
+                      file=sys.stderr)
+                sys.exit(2)
+            print("[경고] vgmstream을 사용할 수 없어 PCM / IMA ADPCM 파일만 변환합니다.", file=sys.stderr)
+
+    if args.use_async:
+        from async_convert import convert_async
+        if VERBOSE and cli and lib:
+            print("[정보] --async 는 vgmstream CLI 프로세스를 사용합니다 (libvgmstream 미사용)")
+        elif VERBOSE and wems and not cli:
+            print("[정보] vgmstream CLI가 없어 --async 는 libvgmstream / vgmstream 모듈을 스레드에서 사용합니다 "
+                  "(--timeout 미적용)")
+        success, failed = convert_async(wems, cli, args.overwrite, max(1, args.workers), args.timeout or None,
+                                        fan_out, worker_settings(cli), site_packages)
+    # the in-process library beats batching CLI processes; batches are for CLI-only setups
+    elif args.cli_batch_size > 1 and not lib and cli and cli[2][0] == '-o':
+        native = [w for w in wems if native_decodable(w)]
+        success, failed = convert_files(native, site_packages, args.overwrite, args.workers, cli, memory_budget,
+                                        fan_out, args.chunksize)
+        native_set = set(native)
+        rest = [w for w in wems if w not in native_set]
+        done, batch_failed = convert_batches(rest, site_packages, args.overwrite, args.workers, cli, memory_budget,
+                                             fan_out, args.cli_batch_size)
+        success += done
+        if batch_failed:
+            if VERBOSE:
+                print(f"[정보] 일괄 변환 실패 {len(batch_failed)}개를 개별 재시도합니다")
+            done, still_failed = convert_files(batch_failed, site_packages, args.overwrite, args.workers, cli,
+                                               memory_budget, fan_out, args.chunksize)
+            success += done
+            failed += still_failed
+    else:
+        if args.cli_batch_size > 1 and not lib and VERBOSE:
+            print("[정보] 일괄 변환에는 -o 를 지원하는 vgmstream CLI가 필요합니다. 파일별로 변환합니다")
+        success, failed = convert_files(wems, site_packages, args.overwrite, args.workers, cli, memory_budget,
+                                        fan_out, args.chunksize)
 
+    write_retry_list(retry_list, failed)
     if VERBOSE:
         print(f"[정보] 변환 완료: 성공 {success}/{total}")
+        if failed:
+            print(f"[정보] 실패 {len(failed)}개 목록: {retry_list} (--retry-failed 로 재시도)")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+"""cpu_plan.py
+
+Split the usable cores between transcription workers and their inference threads.
+
+Every Whisper worker runs CTranslate2 with its own `cpu_threads`, so workers
+x threads has to match the cores this process may actually use: the CPU
+affinity mask, capped by a cgroup CPU quota (containers, CI runners), which
+os.cpu_count() doesn't know about. plan_cpus() picks the split and
+core_sets() the disjoint core lists workers can be pinned to.
+"""
+
+import math
+import os
+
+# cgroup v2 and v1 quota files
+CGROUP_V2_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by the cgroup quota (may be fractional), or None without a quota."""
+    text = _read(CGROUP_V2_MAX)
+    if text:
+        quota, _, period = text.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def allowed_cpus():
+    """CPU ids this process may run on (all of them where affinity isn't supported)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cores():
+    """(usable core count, description) from the affinity mask and cgroup quota."""
+    cpus = len(allowed_cpus())
+    limit = cgroup_cpu_limit()
+    if limit is not None and limit < cpus:
+        # a 2.5 CPU quota still keeps 3 threads busy part of the time; round up
+        return max(1, math.ceil(limit)), f'cgroup 할당량 {limit:g} CPU (코어 {cpus}개 중)'
+    return cpus, f'코어 {cpus}개'
+
+
+def plan_cpus(cores: int, workers: int = 0, threads: int = 0):
+    """Choose (workers, threads per worker) so workers x threads fits in `cores`.
+
+    Explicit values are kept (the other one is derived from them); by
+    default each worker gets a few threads, up to 4 on large machines, and
+    the rest of the cores go to more workers.
+    """
+    if workers and threads:
+        return workers, threads
+    if workers:
+        return workers, max(1, cores // workers)
+    if not threads:
+        threads = max(1, min(4, cores // 4))
+    return max(1, cores // threads), threads
+
+
+def core_sets(workers: int, threads: int):
+    """Disjoint lists of `threads` CPU ids per worker (wrapping if there are too few)."""
+    cpus = allowed_cpus()
+    return [[cpus[(w * threads + t) % len(cpus)] for t in range(threads)] for w in range(workers)]
+
+
+def pin_current_process(cpus) -> bool:
+    """Restrict this process to `cpus`; False where affinity isn't supported or allowed."""
+    if not hasattr(os, 'sched_setaffinity'):
+        return False
+    try:
+        os.sched_setaffinity(0, cpus)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,155 @@
+"""entry_writer.py
+
+Writers for extracted PCK/BNK entries.
+
+EntryWriter writes inline on the caller's thread. AsyncEntryWriter hands the
+work to a dedicated thread through a bounded queue (capped by queued bytes),
+so parsing the next entries overlaps with filesystem latency. Both cache the
+directories they already created, route .wem payloads through an optional
+ContentStore and keep timing counters for the unpack summary.
+
+Callbacks passed to write()/after() always run on the producer's thread
+(during a later write() or flush()), so they may touch objects such as a
+SQLite connection owned by that thread.
+"""
+
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+DEFAULT_QUEUE_BYTES = 64 * 1024 * 1024
+DEFAULT_BATCH = 64
+
+
+class EntryWriter:
+    """Synchronous writer; .wem payloads go through a ContentStore when given."""
+
+    def __init__(self, store=None):
+        self.store = store
+        self.written = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self.write_time = 0.0   # seconds spent in mkdir/open/write/close
+        self.wait_time = 0.0    # seconds the producer was blocked by writing
+        self._dirs = set()
+
+    def _write_now(self, path_to_write: Path, data) -> bool:
+        start = time.perf_counter()
+        try:
+            if self.store is not None and path_to_write.suffix.lower() == '.wem':
+                self.store.write(path_to_write, data)
+            else:
+                parent = path_to_write.parent
+                if parent not in self._dirs:
+                    parent.mkdir(parents=True, exist_ok=True)
+                    self._dirs.add(parent)
+                with open(path_to_write, 'wb') as fh:
+                    fh.write(data)
+        except Exception:
+            # counted and skipped; the async writer thread must never die
+            self.failed += 1
+            return False
+        finally:
+            self.write_time += time.perf_counter() - start
+        self.written += 1
+        self.bytes_written += len(data)
+        return True
+
+    def write(self, path_to_write: Path, data, on_done=None):
+        """Write `data` to `path_to_write`; `on_done()` runs only if it succeeded."""
+        start = time.perf_counter()
+        ok = self._write_now(path_to_write, data)
+        self.wait_time += time.perf_counter() - start
+        if ok and on_done:
+            on_done()
+
+    def after(self, callback):
+        """Run `callback()` once every write issued so far has finished."""
+        callback()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class AsyncEntryWriter(EntryWriter):
+    """Writer thread fed by a queue holding at most `max_queued_bytes` of payload."""
+
+    def __init__(self, store=None, max_queued_bytes: int = DEFAULT_QUEUE_BYTES, batch_size: int = DEFAULT_BATCH):
+        super().__init__(store)
+        self.max_queued_bytes = max_queued_bytes
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._busy = False
+        self._closed = False
+        self._ready = deque()   # callbacks of finished writes, run by the producer
+        self._thread = threading.Thread(target=self._run, name='entry-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # take a batch of queued entries in one go; small files dominate
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._busy = True
+            done_bytes = 0
+            for path_to_write, data, on_done in batch:
+                ok = True if path_to_write is None else self._write_now(path_to_write, data)
+                if ok and on_done:
+                    self._ready.append(on_done)
+                done_bytes += len(data)
+            # drop references so mmap-backed views can be released
+            batch = data = None
+            with self._cond:
+                self._queued_bytes -= done_bytes
+                self._busy = False
+                self._cond.notify_all()
+
+    def _run_callbacks(self):
+        while self._ready:
+            self._ready.popleft()()
+
+    def _put(self, item, size: int):
+        start = time.perf_counter()
+        with self._cond:
+            # an oversized entry is still accepted once the queue is empty
+            while self._queued_bytes and self._queued_bytes + size > self.max_queued_bytes:
+                self._cond.wait()
+            self._queue.append(item)
+            self._queued_bytes += size
+            self._cond.notify_all()
+        self.wait_time += time.perf_counter() - start
+        self._run_callbacks()
+
+    def write(self, path_to_write: Path, data, on_done=None):
+        if isinstance(data, memoryview):
+            # own view: the reader releases the one it yielded after this call
+            data = data[:]
+        self._put((path_to_write, data, on_done), len(data))
+
+    def after(self, callback):
+        self._put((None, b'', callback), 0)
+
+    def flush(self):
+        start = time.perf_counter()
+        with self._cond:
+            while self._queue or self._busy:
+                self._cond.wait()
+        self.wait_time += time.perf_counter() - start
+        self._run_callbacks()
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -1,6 +1,7 @@
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, send_file
 from pathlib import Path
 import threading
+import tempfile
 import sys
 import os
 # Ensure this `app` directory is on sys.path so local imports work when running
@@ -12,9 +13,15 @@ from run_transcription import start_transcription, get_status as get_status_tran
 from run_unpack import start_unpack, get_status as get_status_unpack, stop_unpack
 from run_convert import start_convert, get_status as get_status_convert, stop_convert
 import logging_helper as lg
+from pck_index import INDEX_NAME, PckIndex
+from pck_reader import read_entry
+from preview_cache import DiskLRUCache
 
 app = Flask(__name__, template_folder='../web', static_folder='static')
 
+# Decoded previews for /entry (least recently used files are evicted past the limit)
+PREVIEW_CACHE = DiskLRUCache(HERE.parent / 'cache' / 'preview', max_bytes=512 * 1024 * 1024)
+
 
 @app.route('/')
 def index():
@@ -34,7 +41,8 @@ def start():
     if task == 'unpack':
         out_base = data.get('output', 'unpacked')
         workers = int(data.get('workers') or 0)
-        ok = start_unpack(input_dir, out_base, runtime, workers)
+        executor = data.get('executor') or 'thread'
+        ok = start_unpack(input_dir, out_base, runtime, workers, executor)
         status = get_status_unpack()
     elif task == 'convert':
         site_packages = data.get('site-packages') or data.get('site_packages') or os.path.join('runtime', 'Lib', 'site-packages')
@@ -74,6 +82,72 @@ def stop():
     return jsonify({'stopped': bool(stopped), 'log': status.get('log', '')})
 
 
+@app.route('/index/lookup')
+def index_lookup():
+    # Look up PCK entry coordinates built by `unpack_pck.py --index-only`
+    index_path = request.args.get('index') or os.path.join('input', INDEX_NAME)
+    if not Path(index_path).exists():
+        return jsonify({'error': f'index not found: {index_path}', 'results': []}), 404
+    try:
+        limit = int(request.args.get('limit') or 100)
+    except ValueError:
+        limit = 100
+    with PckIndex(index_path) as idx:
+        rows = idx.query(request.args.get('id'), request.args.get('path'), limit)
+    return jsonify({'results': rows})
+
+
+@app.route('/entry/<wem_id>')
+@app.route('/entry/<path:pck>/<wem_id>')
+def entry(wem_id, pck=None):
+    # Serve one indexed entry straight from its .pck: raw WEM, or WAV decoded
+    # through the convert_wem backends (cached on disk).
+    index_path = request.args.get('index') or os.path.join('input', INDEX_NAME)
+    fmt = request.args.get('format', 'wem')
+    if not Path(index_path).exists():
+        return jsonify({'error': f'index not found: {index_path}'}), 404
+    with PckIndex(index_path) as idx:
+        pck_path = None
+        if pck:
+            # the <pck> segment names one archive exactly (path, trailing path or stem)
+            candidates = idx.find_pcks(pck)
+            if not candidates:
+                return jsonify({'error': f'pck not found: {pck}'}), 404
+            if len(candidates) > 1:
+                return jsonify({'error': f'ambiguous pck: {pck}', 'candidates': candidates}), 409
+            pck_path = candidates[0]
+        rows = [r for r in idx.query(wem_id, limit=50, pck=pck_path)
+                if r['wem_id'] == str(wem_id) and r['codec'] != 'BNK']
+    if not rows:
+        return jsonify({'error': f'entry not found: {wem_id}'}), 404
+    pcks = sorted({r['pck'] for r in rows})
+    if len(pcks) > 1:
+        # the same id in several archives: the caller must pick one (/entry/<pck>/<wem_id>)
+        return jsonify({'error': f'wem id in several pcks: {wem_id}', 'candidates': pcks}), 409
+    row = rows[0]
+    try:
+        data = read_entry(row['pck'], row['offset'], row['size'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if fmt != 'wav':
+        return Response(data, mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename={wem_id}.wem'})
+
+    key = f"{row['pck']}:{row['offset']}:{row['size']}:{Path(row['pck']).stat().st_mtime_ns}"
+    cached = PREVIEW_CACHE.get(key)
+    if cached is None:
+        from convert_wem import convert_wem_to_wav
+        site_packages = request.args.get('site_packages') or os.path.join('runtime', 'Lib', 'site-packages')
+        with tempfile.TemporaryDirectory() as td:
+            wem_path = Path(td) / f'{wem_id}.wem'
+            wav_path = wem_path.with_suffix('.wav')
+            wem_path.write_bytes(data)
+            if not convert_wem_to_wav(str(wem_path), str(wav_path), site_packages, overwrite=True) or not wav_path.exists():
+                return jsonify({'error': f'decode failed: {wem_id}'}), 500
+            cached = PREVIEW_CACHE.put(key, wav_path)
+    return send_file(str(cached), mimetype='audio/wav')
+
+
 @app.route('/logs/stream')
 def stream_logs():
     # stream_logs does not require a per-task log file selection anymore
@@ -0,0 +1,166 @@
+"""native_decoder.py
+
+Built-in decoding of the simple Wwise codecs: PCM and Wwise IMA ADPCM.
+
+SFX/UI banks are often stored this way, and decoding them here avoids
+vgmstream entirely. Everything else (Vorbis, Opus, ...) raises
+UnsupportedCodec so the caller can fall through to the vgmstream backends.
+
+IMA ADPCM blocks are independent (each starts from its own header), so with
+NumPy all blocks and channels are decoded together, one sample position at a
+time; without NumPy a plain Python loop is used.
+
+Wwise IMA block layout (block_align = 0x24 * channels): one 4-byte header per
+channel (int16 predictor, uint8 step index, reserved), then each channel's
+nibbles in turn, low nibble first. The header sample is not output, giving 64
+samples per channel per block.
+"""
+
+import struct
+
+from wav_io import PcmAudio
+from wem_info import HEADER_PROBE_BYTES, parse_wem_header
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure Python decoder is used instead
+    np = None
+
+PCM_TAGS = (0x0001, 0xFFFE)
+IMA_TAG = 0x0002
+
+IMA_STEPS = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+)
+IMA_INDEX = (-1, -1, -1, -1, 2, 4, 6, 8, -1, -1, -1, -1, 2, 4, 6, 8)
+
+
+class UnsupportedCodec(ValueError):
+    """The .wem uses a codec this module doesn't decode."""
+
+
+def can_decode(info: dict) -> bool:
+    """True if a parse_wem_header() result is PCM/IMA this module handles."""
+    if info.get('data_offset') is None or not info.get('channels'):
+        return False
+    if info['format_tag'] in PCM_TAGS:
+        return info['bits'] == 16 or (info['bits'] == 24 and not info['big_endian'])
+    return info['format_tag'] == IMA_TAG and info['block_align'] > 4 * info['channels']
+
+
+def probe_file(path: str) -> dict:
+    """parse_wem_header() of the start of `path`."""
+    with open(path, 'rb') as fh:
+        return parse_wem_header(fh.read(HEADER_PROBE_BYTES))
+
+
+def _ima_samples(block_align: int, channels: int) -> int:
+    return (block_align - 4 * channels) // channels * 2
+
+
+def _decode_ima_numpy(data, channels: int, block_align: int, big_endian: bool) -> bytes:
+    blocks = len(data) // block_align
+    raw = np.frombuffer(data, dtype=np.uint8, count=blocks * block_align).reshape(blocks, block_align)
+    head = raw[:, :4 * channels].reshape(blocks, channels, 4).astype(np.int32)
+    hi, lo = (head[..., 0], head[..., 1]) if big_endian else (head[..., 1], head[..., 0])
+    hist = ((hi << 8) | lo).astype(np.int16).astype(np.int32)
+    index = np.clip(head[..., 2], 0, 88)
+
+    per_channel = (block_align - 4 * channels) // channels
+    body = raw[:, 4 * channels:4 * channels + per_channel * channels].reshape(blocks, channels, per_channel)
+    nibbles = np.empty((blocks, channels, per_channel * 2), dtype=np.int32)
+    nibbles[..., 0::2] = body & 0x0F
+    nibbles[..., 1::2] = body >> 4
+
+    steps = np.array(IMA_STEPS, dtype=np.int32)
+    index_table = np.array(IMA_INDEX, dtype=np.int32)
+    out = np.empty((blocks, per_channel * 2, channels), dtype='<i2')
+    for i in range(per_channel * 2):
+        n = nibbles[..., i]
+        step = steps[index]
+        diff = step >> 3
+        diff += np.where(n & 1, step >> 2, 0)
+        diff += np.where(n & 2, step >> 1, 0)
+        diff += np.where(n & 4, step, 0)
+        hist = np.clip(hist + np.where(n & 8, -diff, diff), -32768, 32767)
+        index = np.clip(index + index_table[n], 0, 88)
+        out[:, i, :] = hist
+    return out.tobytes()
+
+
+def _decode_ima_python(data, channels: int, block_align: int, big_endian: bool) -> bytes:
+    blocks = len(data) // block_align
+    per_channel = (block_align - 4 * channels) // channels
+    samples = per_channel * 2
+    head_fmt = '>hBB' if big_endian else '<hBB'
+    out = [0] * (blocks * samples * channels)
+    for b in range(blocks):
+        base = b * block_align
+        for ch in range(channels):
+            hist, index, _ = struct.unpack_from(head_fmt, data, base + 4 * ch)
+            index = min(max(index, 0), 88)
+            start = base + 4 * channels + ch * per_channel
+            pos = (b * samples) * channels + ch
+            for byte in data[start:start + per_channel]:
+                for n in (byte & 0x0F, byte >> 4):
+                    step = IMA_STEPS[index]
+                    diff = step >> 3
+                    if n & 1:
+                        diff += step >> 2
+                    if n & 2:
+                        diff += step >> 1
+                    if n & 4:
+                        diff += step
+                    hist = min(max(hist - diff if n & 8 else hist + diff, -32768), 32767)
+                    index = min(max(index + IMA_INDEX[n], 0), 88)
+                    out[pos] = hist
+                    pos += channels
+    return struct.pack(f'<{len(out)}h', *out)
+
+
+def decode_ima(data, channels: int, block_align: int, big_endian: bool = False) -> bytes:
+    """Decode Wwise IMA ADPCM `data` to interleaved 16-bit little-endian PCM.
+
+    A trailing partial block is zero padded and its samples trimmed.
+    """
+    full, rest = divmod(len(data), block_align)
+    frames = full * _ima_samples(block_align, channels)
+    if rest > 4 * channels:
+        frames += (rest - 4 * channels) // channels * 2
+        data = bytes(data) + b'\0' * (block_align - rest)
+    decoder = _decode_ima_numpy if np is not None else _decode_ima_python
+    return decoder(data, channels, block_align, big_endian)[:frames * channels * 2]
+
+
+def decode_wem_bytes(buf) -> PcmAudio:
+    """Decode a whole .wem held in `buf`; raises UnsupportedCodec for other codecs."""
+    info = parse_wem_header(buf[:HEADER_PROBE_BYTES])
+    if not can_decode(info):
+        raise UnsupportedCodec(f"내장 디코더 미지원 코덱: {info['codec']}")
+    start = info['data_offset']
+    data = buf[start:start + info['data_size']]
+    channels = info['channels']
+    if info['format_tag'] == IMA_TAG:
+        pcm = decode_ima(data, channels, info['block_align'], info['big_endian'])
+        return PcmAudio(pcm, channels, info['sample_rate'], 2)
+
+    width = info['bits'] // 8
+    data = bytes(data[:len(data) - len(data) % (width * channels)])
+    if info['big_endian']:
+        # RIFX PCM is big-endian 16-bit
+        if np is not None:
+            data = np.frombuffer(data, dtype='>i2').astype('<i2').tobytes()
+        else:
+            data = struct.pack(f'<{len(data) // 2}h', *struct.unpack(f'>{len(data) // 2}h', data))
+    return PcmAudio(data, channels, info['sample_rate'], width)
+
+
+def decode_wem(path: str) -> PcmAudio:
+    with open(path, 'rb') as fh:
+        return decode_wem_bytes(fh.read())
@@ -0,0 +1,224 @@
+"""pck_index.py
+
+Coordinate index of every entry inside a set of .pck files.
+
+`unpack_pck.py --index-only` parses each PCK's lookup tables and the DIDX
+tables of nested soundbanks and stores where every WEM lives (pck, language,
+bank, id, byte offset/size inside the .pck) plus what its header says (codec,
+channels, rate, sample count, duration), without writing any payload. This
+module builds and queries that index.
+
+Usage examples:
+  python app/unpack_pck.py --input input --index-only
+  python app/pck_index.py --id 123456789
+  python app/pck_index.py --path VO_Chapter --limit 20
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+from pck_reader import PCKReader, is_bnk, iter_bnk_media
+from wem_info import HEADER_PROBE_BYTES, parse_wem_header
+
+INDEX_NAME = 'pck_index.sqlite'
+
+# Column order of `entries`; query() returns dicts with these keys.
+COLUMNS = ('pck', 'name', 'section', 'language', 'bank_id', 'wem_id', 'offset', 'size',
+           'codec', 'channels', 'sample_rate', 'bits', 'block_align', 'num_samples', 'duration')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pcks (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    pck TEXT NOT NULL,
+    name TEXT NOT NULL,
+    section TEXT NOT NULL,
+    language TEXT,
+    bank_id TEXT,
+    wem_id TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    codec TEXT,
+    channels INTEGER,
+    sample_rate INTEGER,
+    bits INTEGER,
+    block_align INTEGER,
+    num_samples INTEGER,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_wem ON entries (wem_id);
+CREATE INDEX IF NOT EXISTS idx_entries_pck ON entries (pck);
+"""
+
+
+def _codec_fields(data):
+    try:
+        info = parse_wem_header(data[:HEADER_PROBE_BYTES])
+    except Exception:
+        return None, None, None, None, None, None, None
+    return (info['codec'], info['channels'], info['sample_rate'], info['bits'], info['block_align'],
+            info['num_samples'], info['duration'])
+
+
+def index_pck(pck_path: Path) -> list:
+    """Return one row (tuple in COLUMNS order) per entry of `pck_path`.
+
+    Offsets are absolute within the .pck; WEMs embedded in a soundbank get
+    the bank's language and id and a name matching what unpack_pck writes
+    (`<language>/<bank>_bnk/<wem>.wem`). Only headers are touched.
+    """
+    pck = str(Path(pck_path).resolve())
+    rows = []
+    with PCKReader(pck_path) as reader:
+        for entry, (name, offset, length, data) in zip(reader.entries, reader.iter_entries()):
+            if is_bnk(name, data):
+                rows.append((pck, name, entry.section, entry.language, None, str(entry.id),
+                             offset, length, 'BNK', None, None, None, None, None, None))
+                try:
+                    media = list(iter_bnk_media(data))
+                except ValueError:
+                    continue
+                bank_dir = name[:-len('.bnk')] if name.lower().endswith('.bnk') else name
+                for wem_id, rel, size, view in media:
+                    rows.append((pck, f'{bank_dir}_bnk/{wem_id}.wem', 'bnk', entry.language, str(entry.id),
+                                 str(wem_id), offset + rel, size, *_codec_fields(view)))
+            else:
+                rows.append((pck, name, entry.section, entry.language, None, str(entry.id),
+                             offset, length, *_codec_fields(data)))
+    return rows
+
+
+class PckIndex:
+    """SQLite-backed coordinate index."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=60, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._upgrade()
+
+    def _upgrade(self):
+        """Add columns missing from an index built by an older version; its
+        pcks are then re-indexed on the next build."""
+        have = {r['name'] for r in self._conn.execute('PRAGMA table_info(entries)')}
+        missing = [c for c in ('num_samples INTEGER', 'duration REAL') if c.split()[0] not in have]
+        if missing:
+            with self._conn:
+                for column in missing:
+                    self._conn.execute(f'ALTER TABLE entries ADD COLUMN {column}')
+                self._conn.execute('DELETE FROM pcks')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def is_current(self, pck_path: Path) -> bool:
+        """True if `pck_path` is indexed and unchanged since (size, mtime)."""
+        st = pck_path.stat()
+        row = self._conn.execute('SELECT size, mtime_ns FROM pcks WHERE path = ?',
+                                 (str(pck_path.resolve()),)).fetchone()
+        return row is not None and (row['size'], row['mtime_ns']) == (st.st_size, st.st_mtime_ns)
+
+    def replace(self, pck_path: Path, rows: list):
+        """Store `rows` as the full entry list of `pck_path`."""
+        pck = str(pck_path.resolve())
+        st = pck_path.stat()
+        with self._conn:
+            self._conn.execute('DELETE FROM entries WHERE pck = ?', (pck,))
+            self._conn.executemany(
+                f'INSERT INTO entries ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})', rows)
+            self._conn.execute('INSERT OR REPLACE INTO pcks (path, size, mtime_ns, entries) VALUES (?, ?, ?, ?)',
+                               (pck, st.st_size, st.st_mtime_ns, len(rows)))
+
+    def find_pcks(self, name: str) -> list:
+        """Indexed pck paths that `name` names exactly: the full path, a trailing part of it
+        (e.g. 'Audio/VO_2.pck'), or the same with the '.pck' extension left off."""
+        want = name.replace('\\', '/').strip('/').lower()
+        found = []
+        for (path,) in self._conn.execute('SELECT path FROM pcks ORDER BY path'):
+            norm = path.replace('\\', '/').lower()
+            stem = norm[:-4] if norm.endswith('.pck') else norm
+            for full in (norm, stem):
+                if full == want or full.endswith('/' + want):
+                    found.append(path)
+                    break
+        return found
+
+    def query(self, wem_id=None, path=None, limit: int = 100, pck=None) -> list:
+        """Look entries up by WEM/bank id, a substring of the pck path or entry name, and/or an exact pck."""
+        where, params = [], []
+        if wem_id not in (None, ''):
+            where.append('(wem_id = ? OR bank_id = ?)')
+            params += [str(wem_id), str(wem_id)]
+        if path:
+            # match `path` literally: _ and % are common in pck/entry names
+            pattern = '%' + path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where.append("(pck LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        if pck:
+            where.append('pck = ?')
+            params.append(str(pck))
+        sql = f'SELECT {", ".join(COLUMNS)} FROM entries'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY pck, offset LIMIT ?'
+        params.append(int(limit))
+        return [dict(r) for r in self._conn.execute(sql, params)]
+
+
+def build_index(pcks, db_path, force: bool = False):
+    """Index every path in `pcks`; yields (pck_path, entry_count or None, error)."""
+    with PckIndex(db_path) as idx:
+        for pck_path in pcks:
+            try:
+                if not force and idx.is_current(pck_path):
+                    yield pck_path, None, None
+                    continue
+                rows = index_pck(pck_path)
+                idx.replace(pck_path, rows)
+                yield pck_path, len(rows), None
+            except Exception as e:
+                yield pck_path, None, e
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the PCK coordinate index')
+    parser.add_argument('--index', default=str(Path('input') / INDEX_NAME), help='index database path')
+    parser.add_argument('--id', default=None, help='WEM or bank id')
+    parser.add_argument('--path', default=None, help='substring of the pck path or entry name')
+    parser.add_argument('--limit', type=int, default=100, help='maximum number of rows')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of TSV')
+    args = parser.parse_args()
+
+    if not Path(args.index).exists():
+        print(f'색인 파일이 없습니다: {args.index}', file=sys.stderr)
+        sys.exit(2)
+
+    with PckIndex(args.index) as idx:
+        rows = idx.query(args.id, args.path, args.limit)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    print('\t'.join(COLUMNS))
+    for r in rows:
+        print('\t'.join('' if r[c] is None else str(r[c]) for c in COLUMNS))
+
+
+if __name__ == '__main__':
+    main()
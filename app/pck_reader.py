@@ -0,0 +1,244 @@
+"""pck_reader.py
+
+Streaming reader for Wwise AKPK (.pck) archives.
+
+The archive is memory-mapped and only the header / lookup tables are parsed
+up front. Entries are then yielded one at a time as
+(name, offset, length, memoryview) so a writer can copy each slice to disk
+without building the whole archive in memory (HoyoAudioTools' PCKextract
+returns a dict holding every file as bytes).
+
+Layout (little endian):
+  'AKPK' | header_size | version | lang_map_size | banks_size | sounds_size [| externals_size]
+  language map:  count, count * (string_offset, lang_id), strings
+  lookup tables: count, count * (id, block_size, size, start_block, lang_id)
+                 (externals use a 64-bit id)
+
+Soundbanks (.bnk) found inside a package are a chain of (tag, size, payload)
+chunks; embedded WEMs are described by DIDX (id, offset, size) records that
+index into the DATA chunk, so they can be sliced without another read.
+"""
+
+import os
+import mmap
+import struct
+from collections import namedtuple
+from pathlib import Path
+
+# One lookup table record. `name` is the relative output path ("<language>/<id>.<ext>").
+TableEntry = namedtuple('TableEntry', 'section id language offset size name')
+
+# One streamed entry; `data` is a memoryview into the mapped archive and is
+# only valid until the reader is closed.
+PckEntry = namedtuple('PckEntry', 'name offset length data')
+
+# (section name, file extension) in the order the tables follow the language map
+SECTIONS = (('banks', 'bnk'), ('sounds', 'wem'), ('externals', 'wem'))
+
+
+def _read_lang_string(buf, start: int, end: int) -> str:
+    """Read a NUL terminated language name (UTF-16LE or ASCII)."""
+    if start + 1 < end and buf[start + 1] == 0:
+        pos = start
+        while pos + 1 < end and (buf[pos] or buf[pos + 1]):
+            pos += 2
+        return bytes(buf[start:pos]).decode('utf-16-le', errors='replace')
+    pos = start
+    while pos < end and buf[pos]:
+        pos += 1
+    return bytes(buf[start:pos]).decode('utf-8', errors='replace')
+
+
+def parse_header(buf):
+    """Parse the AKPK header of `buf` (bytes/mmap).
+
+    Returns (languages, entries) where `languages` maps lang_id -> name and
+    `entries` is a list of TableEntry in table order. Raises ValueError when
+    the data is not a supported AKPK archive.
+    """
+    size = len(buf)
+    if size < 24 or bytes(buf[0:4]) != b'AKPK':
+        raise ValueError('AKPK 헤더가 아닙니다')
+
+    header_size, _version, lang_size = struct.unpack_from('<III', buf, 4)
+    if header_size + 8 > size:
+        raise ValueError('헤더 크기가 파일보다 큽니다')
+
+    # Older packages have three lookup tables, newer ones add 64-bit "externals".
+    table_sizes = list(struct.unpack_from('<II', buf, 16))
+    pos = 24
+    if size >= 28:
+        ext_size = struct.unpack_from('<I', buf, 24)[0]
+        if 20 + lang_size + sum(table_sizes) + ext_size == header_size:
+            table_sizes.append(ext_size)
+            pos = 28
+    if len(table_sizes) == 2 and 16 + lang_size + sum(table_sizes) != header_size:
+        raise ValueError('알 수 없는 AKPK 헤더 형식입니다')
+
+    # language map
+    languages = {}
+    lang_end = pos + lang_size
+    if lang_size >= 4:
+        count = struct.unpack_from('<I', buf, pos)[0]
+        if 4 + count * 8 > lang_size:
+            raise ValueError('언어 테이블이 손상되었습니다')
+        for i in range(count):
+            str_off, lang_id = struct.unpack_from('<II', buf, pos + 4 + i * 8)
+            languages[lang_id] = _read_lang_string(buf, pos + str_off, lang_end)
+    pos = lang_end
+
+    entries = []
+    for (section, ext), table_size in zip(SECTIONS, table_sizes):
+        table_end = pos + table_size
+        if table_size >= 4:
+            count = struct.unpack_from('<I', buf, pos)[0]
+            rec = (table_size - 4) // count if count else 0
+            if count and rec not in (20, 24):
+                raise ValueError(f'{section} 테이블 레코드 크기를 알 수 없습니다: {rec}')
+            fmt = '<QIIII' if rec == 24 else '<IIIII'
+            for i in range(count):
+                fid, block, length, start, lang_id = struct.unpack_from(fmt, buf, pos + 4 + i * rec)
+                offset = start * (block or 1)
+                if offset + length > size:
+                    raise ValueError(f'{section} 항목 {fid}가 파일 범위를 벗어납니다')
+                lang = languages.get(lang_id, str(lang_id))
+                entries.append(TableEntry(section, fid, lang, offset, length, f'{lang}/{fid}.{ext}'))
+        pos = table_end
+
+    return languages, entries
+
+
+def read_entry(path, offset: int, size: int) -> bytes:
+    """Read `size` bytes at `offset` of `path` without mapping or parsing the archive.
+
+    Uses os.pread where available (positioned read, no shared file offset),
+    seek + read otherwise.
+    """
+    fd = os.open(str(path), os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        chunks = []
+        remaining = size
+        if not hasattr(os, 'pread'):
+            os.lseek(fd, offset, os.SEEK_SET)
+        while remaining > 0:
+            if hasattr(os, 'pread'):
+                chunk = os.pread(fd, remaining, offset + size - remaining)
+            else:
+                chunk = os.read(fd, remaining)
+            if not chunk:
+                raise ValueError(f'{path}: 파일이 예상보다 짧습니다 (offset {offset}, size {size})')
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+    finally:
+        os.close(fd)
+
+
+def parse_bnk_chunks(buf) -> dict:
+    """Return {tag: (payload_offset, size)} for the chunks of a soundbank."""
+    chunks = {}
+    size = len(buf)
+    pos = 0
+    while pos + 8 <= size:
+        tag = bytes(buf[pos:pos + 4]).decode('ascii', errors='replace')
+        length = struct.unpack_from('<I', buf, pos + 4)[0]
+        if pos + 8 + length > size:
+            raise ValueError(f'bnk 청크 {tag}가 파일 범위를 벗어납니다')
+        chunks.setdefault(tag, (pos + 8, length))
+        pos += 8 + length
+    return chunks
+
+
+def is_bnk(name, buf) -> bool:
+    """True if an entry looks like a soundbank (by extension or BKHD magic)."""
+    if str(name).lower().endswith('.bnk'):
+        return True
+    return len(buf) >= 8 and bytes(buf[0:4]) == b'BKHD'
+
+
+def iter_bnk_media(buf):
+    """Yield (wem_id, offset, size, view) for every WEM embedded in a soundbank.
+
+    `offset` is relative to the start of `buf`. Banks without DIDX/DATA (event
+    or metadata-only banks) yield nothing. Raises ValueError on a broken bank.
+    """
+    chunks = parse_bnk_chunks(buf)
+    if 'DIDX' not in chunks or 'DATA' not in chunks:
+        return
+    didx_off, didx_size = chunks['DIDX']
+    data_off, data_size = chunks['DATA']
+    view = memoryview(buf)
+    try:
+        for pos in range(didx_off, didx_off + didx_size - 11, 12):
+            wem_id, rel, length = struct.unpack_from('<III', buf, pos)
+            if rel + length > data_size:
+                raise ValueError(f'bnk 미디어 {wem_id}가 DATA 범위를 벗어납니다')
+            start = data_off + rel
+            yield wem_id, start, length, view[start:start + length]
+    finally:
+        view.release()
+
+
+class PCKReader:
+    """Memory-mapped AKPK reader.
+
+    Usage:
+        with PCKReader(path) as reader:
+            for name, offset, length, data in reader.iter_entries():
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.languages = {}
+        self.entries = []
+        self._fh = None
+        self._mm = None
+        self._view = None
+
+    def open(self):
+        self._fh = open(self.path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self.languages, self.entries = parse_header(self._mm)
+        except Exception:
+            self.close()
+            raise
+        self._view = memoryview(self._mm)
+        return self
+
+    def close(self):
+        if self._view is not None:
+            try:
+                self._view.release()
+            except BufferError:
+                # a caller still holds a slice; the map is freed once it is dropped
+                pass
+            self._view = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def iter_entries(self):
+        """Yield PckEntry(name, offset, length, memoryview) for every table entry."""
+        if self._view is None:
+            raise ValueError('PCKReader가 열려 있지 않습니다')
+        for e in self.entries:
+            data = self._view[e.offset:e.offset + e.size]
+            try:
+                yield PckEntry(e.name, e.offset, e.size, data)
+            finally:
+                data.release()
@@ -0,0 +1,69 @@
+"""preview_cache.py
+
+Size-bounded LRU cache of decoded preview files on disk.
+
+Files are named by a hash of the caller's key. A hit touches the file's mtime,
+so the least recently used entries are the ones with the oldest mtime and are
+evicted first once the directory grows past `max_bytes`.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+
+class DiskLRUCache:
+    def __init__(self, root, max_bytes: int, suffix: str = '.wav'):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return self.root / f'{digest}{self.suffix}'
+
+    def get(self, key: str):
+        """Return the cached file for `key` (marking it recently used) or None."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                os.utime(path)
+            except OSError:
+                return None
+        return path
+
+    def put(self, key: str, src) -> Path:
+        """Move `src` into the cache under `key` and return its cached path."""
+        path = self._path(key)
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + '.tmp')
+            shutil.move(str(src), str(tmp))
+            os.replace(tmp, path)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        files = []
+        total = 0
+        for p in self.root.glob(f'*{self.suffix}'):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        files.sort()
+        for _mtime, size, p in files:
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,24 @@
+"""proc_stats.py
+
+Peak memory of the current process and its children, for the throughput
+reports of transcribe.py and bench_unpack.py.
+"""
+
+import sys
+
+
+def peak_rss_mb():
+    """(this process, largest waited-for child) peak resident set size in MB; None where unknown."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: psutil if available (child processes aren't covered)
+        try:
+            import psutil  # type: ignore
+            return round(psutil.Process().memory_info().peak_wset / 1048576, 1), None
+        except Exception:
+            return None, None
+    scale = 1 if sys.platform == 'darwin' else 1024   # ru_maxrss is bytes on macOS, KiB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1048576
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1048576
+    return round(own, 1), (round(children, 1) if children else None)
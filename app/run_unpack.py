@@ -9,13 +9,13 @@ _runner = TaskProcess('unpack')
 
 
 
-def start_unpack(input_dir='input', out_base='unpacked', runtime=None, workers=0):
+def start_unpack(input_dir='input', out_base='unpacked', runtime=None, workers=0, executor='thread'):
     runtime_python = ROOT / runtime / 'python.exe' if runtime else Path(sys.executable)
     if runtime and not runtime_python.exists():
         runtime_python = Path(sys.executable)
 
     cmd = [str(runtime_python), str(ROOT / 'app' / 'unpack_pck.py'),
-           '--input', str(input_dir), '--output', str(out_base), '--workers', str(workers)]
+           '--input', str(input_dir), '--output', str(out_base), '--workers', str(workers), '--executor', executor or 'thread']
 
     env = os.environ.copy()
     env['PYTHONUTF8'] = '1'
@@ -39,5 +39,6 @@ if __name__ == '__main__':
     parser.add_argument('--output', default='unpacked')
     parser.add_argument('--runtime', default=None)
     parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
     args = parser.parse_args()
-    start_unpack(args.input, args.output, args.runtime, args.workers)
+    start_unpack(args.input, args.output, args.runtime, args.workers, args.executor)
@@ -0,0 +1,113 @@
+"""scheduler.py
+
+Size-aware, memory-budgeted job admission for concurrent.futures pools.
+
+Jobs carry an estimated memory cost. The largest jobs are started first so a
+huge file doesn't end up running alone at the end, and a job is only admitted
+while the estimated in-flight bytes stay under the budget. A job that doesn't
+fit waits; smaller ones that do fit may go ahead of it, but only `max_bypass`
+of them: after that the budget is reserved for the waiting job and nothing
+else is admitted until it starts, so the largest files can't starve. A job
+larger than the whole budget still runs once nothing else is in flight.
+"""
+
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+_SIZE_RE = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*([kmgt]?)i?b?\s*$', re.IGNORECASE)
+_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+def parse_size(text):
+    """Parse '512M', '4G', '1.5GB' or a plain byte count; None/'' -> None."""
+    if text in (None, '', '0'):
+        return None
+    m = _SIZE_RE.match(str(text))
+    if not m:
+        raise ValueError(f'크기 형식을 알 수 없습니다: {text}')
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+
+class BudgetScheduler:
+    """Run jobs on an executor, largest first, under an optional memory budget.
+
+    jobs: iterable of (cost_bytes, key, fn, args). run() yields (key, future)
+    as jobs finish; `stats` / summary() describe how busy the workers were.
+    """
+
+    def __init__(self, workers: int, memory_budget=None, max_bypass=None):
+        self.workers = max(1, workers)
+        self.memory_budget = memory_budget
+        # smaller jobs admitted ahead of a blocked one before its budget is reserved
+        self.max_bypass = self.workers if max_bypass is None else max_bypass
+        self.stats = {}
+
+    def _fits(self, cost: int, in_flight: int, running: int) -> bool:
+        if self.memory_budget is None or running == 0:
+            return True
+        return in_flight + cost <= self.memory_budget
+
+    def run(self, executor, jobs):
+        pending = sorted(jobs, key=lambda j: j[0], reverse=True)
+        running = {}        # future -> (cost, key, started)
+        in_flight = 0
+        peak_in_flight = 0
+        busy = 0.0
+        deferred = 0
+        bypassed = {}       # key -> smaller jobs admitted while it was blocked
+        start = time.perf_counter()
+        try:
+            while pending or running:
+                # admit as many jobs as free workers and the budget allow
+                i = 0
+                blocked = None      # key of the largest pending job that doesn't fit
+                while i < len(pending) and len(running) < self.workers:
+                    cost, key, fn, args = pending[i]
+                    if not self._fits(cost, in_flight, len(running)):
+                        if blocked is None:
+                            blocked = key
+                        i += 1
+                        continue
+                    if blocked is not None:
+                        if bypassed.get(blocked, 0) >= self.max_bypass:
+                            # reserve the budget: admit nothing until the blocked job fits
+                            break
+                        bypassed[blocked] = bypassed.get(blocked, 0) + 1
+                    pending.pop(i)
+                    running[executor.submit(fn, *args)] = (cost, key, time.perf_counter())
+                    in_flight += cost
+                    peak_in_flight = max(peak_in_flight, in_flight)
+                if blocked is not None and len(running) < self.workers:
+                    deferred += 1
+                if not running:
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                now = time.perf_counter()
+                for fut in finished:
+                    cost, key, started = running.pop(fut)
+                    in_flight -= cost
+                    busy += now - started
+                    yield key, fut
+        finally:
+            wall = time.perf_counter() - start
+            capacity = wall * self.workers
+            self.stats = {
+                'wall': wall,
+                'busy': busy,
+                'utilization': (busy / capacity) if capacity > 0 else 0.0,
+                'idle_worker_seconds': max(0.0, capacity - busy),
+                'peak_in_flight_bytes': peak_in_flight,
+                'budget_waits': deferred,
+            }
+
+    def summary(self) -> str:
+        s = self.stats
+        if not s:
+            return ''
+        text = (f'작업자 가동률: {s["utilization"] * 100:.1f}% '
+                f'(유휴 작업자-초 {s["idle_worker_seconds"]:.1f}, '
+                f'동시 메모리 추정 최대 {s["peak_in_flight_bytes"] / 1048576:.1f} MB')
+        if self.memory_budget is not None:
+            text += f' / 예산 {self.memory_budget / 1048576:.1f} MB, 예산 대기 {s["budget_waits"]}회'
+        return text + ')'
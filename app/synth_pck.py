@@ -0,0 +1,186 @@
+"""synth_pck.py
+
+Generate valid synthetic AKPK (.pck) archives for benchmarks and local
+testing without proprietary game files.
+
+Every loose entry is a RIFF/WAVE .wem with a real `fmt ` chunk (PCM, IMA
+ADPCM or Vorbis tag) and filler audio data; banks are BKHD/DIDX/DATA
+soundbanks with embedded WEMs. Payload bytes are generated on the fly while
+the archive is written, so large corpora don't need to fit in memory.
+
+Usage examples:
+  python app/synth_pck.py --output synth --pcks 4 --entries 2000
+  python app/synth_pck.py --output synth --banks 8 --bank-wems 50 --languages sfx,english(us),korean
+"""
+
+import argparse
+import random
+import struct
+from pathlib import Path
+
+# fmt chunk values per codec: (format_tag, bits_per_sample)
+CODEC_FORMATS = {'pcm': (0xFFFE, 16), 'adpcm': (0x0002, 4), 'vorbis': (0xFFFF, 0)}
+
+# RIFF/WAVE (12) + fmt chunk (8 + 24) + data chunk header (8)
+WEM_HEADER_BYTES = 52
+
+
+def make_wem(data_size: int, rng: random.Random, codec: str = 'pcm', channels: int = 1, rate: int = 48000) -> bytes:
+    """Return a RIFF/WAVE .wem with a `fmt ` chunk and `data_size` bytes of filler.
+
+    The result is always WEM_HEADER_BYTES + data_size long.
+    """
+    fmt_tag, bits = CODEC_FORMATS[codec]
+    if codec == 'adpcm':
+        block_align = 0x24 * channels
+        avg = rate * block_align // 64
+    else:
+        block_align = channels * max(bits, 8) // 8
+        avg = rate * block_align
+    fmt = struct.pack('<HHIIHH', fmt_tag, channels, rate, avg, block_align, bits)
+    fmt += struct.pack('<HHI', 6, 0, 0)          # cbSize, extra (valid bits / samples), channel mask
+    data = rng.randbytes(data_size)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def make_bnk(bank_id: int, wems, align: int = 16) -> bytes:
+    """Return a soundbank embedding `wems` = [(wem_id, bytes), ...]."""
+    didx = b''
+    data = b''
+    for wem_id, payload in wems:
+        data += b'\0' * (-len(data) % align)
+        didx += struct.pack('<III', wem_id, len(data), len(payload))
+        data += payload
+    bkhd = struct.pack('<II', 0x8C, bank_id) + b'\0' * 8
+    out = b'BKHD' + struct.pack('<I', len(bkhd)) + bkhd
+    if wems:
+        out += b'DIDX' + struct.pack('<I', len(didx)) + didx
+        out += b'DATA' + struct.pack('<I', len(data)) + data
+    return out
+
+
+def write_pck(path: Path, languages: dict, tables, align: int = 16):
+    """Write an AKPK archive.
+
+    `languages` maps lang_id -> name; `tables` is [banks, sounds, externals],
+    each a list of (file_id, lang_id, size, make_payload) where
+    `make_payload()` returns exactly `size` bytes. Externals use 64-bit ids.
+    """
+    names = b''
+    recs = b''
+    base = 4 + 8 * len(languages)
+    for lang_id, name in languages.items():
+        recs += struct.pack('<II', base + len(names), lang_id)
+        names += name.encode('utf-16-le') + b'\0\0'
+    lang_map = struct.pack('<I', len(languages)) + recs + names
+    lang_map += b'\0' * (-len(lang_map) % 4)
+
+    rec_sizes = (20, 20, 24)
+    table_sizes = [4 + rec_sizes[i] * len(t) for i, t in enumerate(tables)]
+    header_len = 8 + 4 + 4 + 4 * len(tables) + len(lang_map) + sum(table_sizes)
+
+    # lay the payloads out after the header, each aligned to `align`
+    offset = header_len
+    blobs = []
+    packed_tables = []
+    for i, table in enumerate(tables):
+        packed = struct.pack('<I', len(table))
+        fmt = '<QIIII' if rec_sizes[i] == 24 else '<IIIII'
+        for file_id, lang_id, size, make_payload in table:
+            offset += -offset % align
+            packed += struct.pack(fmt, file_id, align, size, offset // align, lang_id)
+            blobs.append((offset, size, make_payload))
+            offset += size
+        packed_tables.append(packed)
+
+    header = (b'AKPK' + struct.pack('<I', header_len - 8) + struct.pack('<II', 1, len(lang_map))
+              + b''.join(struct.pack('<I', n) for n in table_sizes) + lang_map + b''.join(packed_tables))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(header)
+        pos = len(header)
+        for blob_offset, size, make_payload in blobs:
+            fh.write(b'\0' * (blob_offset - pos))
+            payload = make_payload()
+            if len(payload) != size:
+                raise ValueError(f'payload size mismatch: {len(payload)} != {size}')
+            fh.write(payload)
+            pos = blob_offset + size
+
+
+def generate_corpus(out_dir, pcks: int = 2, entries: int = 500, min_size: int = 2048, max_size: int = 65536,
+                    languages=('sfx',), banks: int = 2, bank_wems: int = 20, externals: int = 0,
+                    codec: str = 'pcm', dup_ratio: float = 0.0, seed: int = 1234) -> list:
+    """Write `pcks` synthetic archives into `out_dir` and return their paths.
+
+    `dup_ratio` is the fraction of loose entries that reuse an earlier
+    payload (useful for the content store).
+    """
+    out_dir = Path(out_dir)
+    rng = random.Random(seed)
+    lang_map = {i: name for i, name in enumerate(languages)}
+    paths = []
+    next_id = 100000
+    produced = []   # (seed, size) of payloads eligible for duplication
+
+    def wem_factory(payload_seed, data_size):
+        # deterministic payload, rebuilt only when the writer needs it
+        return lambda: make_wem(data_size, random.Random(payload_seed), codec)
+
+    def audio_size():
+        size = rng.randint(min_size, max_size)
+        # keep ADPCM data a whole number of (mono) blocks
+        return size - size % 0x24 if codec == 'adpcm' else size
+
+    for n in range(pcks):
+        tables = [[], [], []]
+        for _ in range(banks):
+            wems = []
+            for _ in range(bank_wems):
+                wems.append((next_id, make_wem(audio_size(), random.Random(rng.random()), codec)))
+                next_id += 1
+            bnk = make_bnk(next_id, wems)
+            tables[0].append((next_id, rng.randrange(len(lang_map)), len(bnk), (lambda b=bnk: b)))
+            next_id += 1
+        for i in range(entries + externals):
+            if produced and rng.random() < dup_ratio:
+                payload_seed, data_size = rng.choice(produced)
+            else:
+                payload_seed, data_size = rng.random(), audio_size()
+                produced.append((payload_seed, data_size))
+            item = (next_id, rng.randrange(len(lang_map)), WEM_HEADER_BYTES + data_size,
+                    wem_factory(payload_seed, data_size))
+            tables[1 if i < entries else 2].append(item)
+            next_id += 1
+        path = out_dir / f'synth_{n:03d}.pck'
+        write_pck(path, lang_map, tables)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic .pck archives')
+    parser.add_argument('--output', '-o', default='synth', help='output folder')
+    parser.add_argument('--pcks', type=int, default=2, help='number of .pck files')
+    parser.add_argument('--entries', type=int, default=500, help='loose .wem entries per pck')
+    parser.add_argument('--externals', type=int, default=0, help='64-bit id (externals) entries per pck')
+    parser.add_argument('--min-size', type=int, default=2048, help='minimum audio bytes per wem')
+    parser.add_argument('--max-size', type=int, default=65536, help='maximum audio bytes per wem')
+    parser.add_argument('--languages', default='sfx', help='comma separated language table')
+    parser.add_argument('--banks', type=int, default=2, help='soundbanks per pck')
+    parser.add_argument('--bank-wems', type=int, default=20, help='embedded wems per soundbank')
+    parser.add_argument('--codec', choices=sorted(CODEC_FORMATS), default='pcm', help='fmt tag written into each wem')
+    parser.add_argument('--dup-ratio', type=float, default=0.0, help='fraction of entries reusing an earlier payload')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output, args.pcks, args.entries, args.min_size, args.max_size,
+                            [x.strip() for x in args.languages.split(',') if x.strip()],
+                            args.banks, args.bank_wems, args.externals, args.codec, args.dup_ratio, args.seed)
+    total = sum(p.stat().st_size for p in paths)
+    print(f'생성 완료: pck {len(paths)}개, {total / 1048576:.1f} MB -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
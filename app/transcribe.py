@@ -2,13 +2,16 @@ import os
 import sys
 import argparse
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 import traceback
 import subprocess
 import glob
 import builtins
 import logging
+import time
+
+from proc_stats import peak_rss_mb
 
 # Ensure local `lib` is on path for packages installed with `pip --target=lib`
 HERE = Path(__file__).resolve().parent
@@ -202,33 +205,99 @@ def detect_and_use_known_runtime(cli_runtime: str = None):
 
 
 MODEL = None
+# files written by handle_result() in this run (for the throughput line)
+RUN_STATS = {'done': 0}
 
 
-def init_model(model_size, device, compute_type):
-    # initializer for worker processes
+def init_model(model_size, device, compute_type, cpu_threads=0, num_workers=1):
+    # initializer for worker processes; with --shared-model, called once in the main process
     global MODEL
     try:
         from faster_whisper import WhisperModel
     except Exception as e:
         print("모듈 `faster_whisper` 를 불러올 수 없습니다. lib 폴더에 설치했는지 확인하세요.")
         raise
+    # num_workers > 1 lets that many threads run inference on the one model at once
+    kwargs = {'cpu_threads': cpu_threads, 'num_workers': num_workers}
     try:
         if compute_type:
-            MODEL = WhisperModel(model_size, device=device, compute_type=compute_type)
+            MODEL = WhisperModel(model_size, device=device, compute_type=compute_type, **kwargs)
         else:
-            MODEL = WhisperModel(model_size, device=device)
+            MODEL = WhisperModel(model_size, device=device, **kwargs)
     except TypeError as e:
         # Some ctranslate2 builds (or environments) may not accept cuda/device kwargs on Windows.
         print(f"WhisperModel 초기화 중 TypeError 발생: {e}")
         if device == 'cuda':
             print('GPU 초기화 실패 — CPU로 폴백하여 모델을 로드합니다.')
-            MODEL = WhisperModel(model_size, device='cpu', compute_type=compute_type)
+            MODEL = WhisperModel(model_size, device='cpu', compute_type=compute_type, **kwargs)
         else:
             raise
 
 
-def transcribe_file(path):
-    """Worker: transcribe one wav file and return serializable result."""
+def init_pinned_model(counter, cpu_sets, *model_args):
+    """Process pool initializer for --pin-cpus: take the next core set, then load the model."""
+    from cpu_plan import pin_current_process
+    with counter.get_lock():
+        slot = counter.value
+        counter.value += 1
+    cpus = cpu_sets[slot % len(cpu_sets)]
+    if not pin_current_process(cpus):
+        print('CPU 고정 실패(지원되지 않음):', cpus)
+    init_model(*model_args)
+
+
+def make_executor(args, workers):
+    """Process pool with a model per worker, or (--shared-model) threads sharing one model."""
+    model_args = (args.model, args.device, args.compute_type, args.cpu_threads)
+    cpu_sets = None
+    if args.pin_cpus:
+        from cpu_plan import core_sets
+        cpu_sets = core_sets(workers, args.cpu_threads)
+    if args.shared_model:
+        print(f'공유 모델: 모델 1개, 추론 스레드 {workers}개 x CPU 스레드 {args.cpu_threads}개')
+        if cpu_sets:
+            # CTranslate2 creates its own threads, so only the process as a whole can be pinned
+            from cpu_plan import pin_current_process
+            cpus = sorted({c for cpus in cpu_sets for c in cpus})
+            print('CPU 고정(프로세스 전체):', cpus if pin_current_process(cpus) else '지원되지 않음')
+        init_model(*model_args, num_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whisper')
+    if cpu_sets:
+        print('CPU 고정(워커별):', ' '.join(','.join(map(str, cpus)) for cpus in cpu_sets))
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_pinned_model,
+                                   initargs=(multiprocessing.Value('i', 0), cpu_sets) + model_args)
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_model, initargs=model_args)
+
+
+def report_throughput(started, args, workers):
+    """Print files/s of this run next to peak memory."""
+    elapsed = time.perf_counter() - started
+    done = RUN_STATS['done']
+    own, child = peak_rss_mb()
+    if args.shared_model or child is None:
+        memory = f'최대 RSS {own} MB' if own is not None else '최대 RSS 알 수 없음'
+    else:
+        memory = f'최대 RSS 주 프로세스 {own} MB, 워커당 {child} MB (워커 {workers}개)'
+    print(f'처리량: {done}개 / {elapsed:.1f}초 ({done / max(elapsed, 1e-9):.2f} 파일/초), {memory}')
+
+
+def make_result(path, segs, language):
+    """Serializable result for one file from its segments (dicts with start, end, text)."""
+    # classify: if any word-like characters in transcript -> Voice
+    import re
+    combined_text = " ".join(s["text"] for s in segs).strip()
+    classification = "Voice" if re.search(r"\w", combined_text) else "SFX"
+    return {
+        "path": str(path),
+        "segments": segs,
+        "language": language,
+        "classification": classification,
+        "subtitles": combined_text,
+    }
+
+
+def _transcribe(source, path):
+    """Run the worker's model on `source` (a file path or 16 kHz float32 samples)."""
     global MODEL
     try:
         from faster_whisper import WhisperModel
@@ -237,7 +306,7 @@ def transcribe_file(path):
             # fallback: create model in this process (rare)
             MODEL = WhisperModel("small", device="cpu")
 
-        segments, info = MODEL.transcribe(str(path), beam_size=5)
+        segments, info = MODEL.transcribe(source, beam_size=5)
         segs = []
         for s in segments:
             segs.append({
@@ -246,21 +315,152 @@ def transcribe_file(path):
                 "text": s.text.strip()
             })
         language = getattr(info, "language", "") or ""
-        # classify: if any word-like characters in transcript -> Voice
-        import re
-        combined_text = " ".join(s["text"] for s in segs).strip()
-        classification = "Voice" if re.search(r"\w", combined_text) else "SFX"
-        return {
-            "path": str(path),
-            "segments": segs,
-            "language": language,
-            "classification": classification,
-            "subtitles": combined_text,
-        }
+        return make_result(path, segs, language)
     except Exception as e:
         return {"path": str(path), "error": traceback.format_exc()}
 
 
+def transcribe_file(path):
+    """Worker: transcribe one wav file and return serializable result."""
+    return _transcribe(str(path), path)
+
+
+def transcribe_audio(path, samples):
+    """Worker: transcribe decoded 16 kHz mono float32 `samples` reported as `path`."""
+    return _transcribe(samples, path)
+
+
+def transcribe_batch(items):
+    """Worker: transcribe [(path, wav path or 16 kHz float32 samples), ...] with batched inference.
+
+    Clips of up to 30 s share encoder/decoder passes (whisper_batch); longer
+    clips, and every clip of a batch that fails, go through the per-file path.
+    Returns one result per item, in order.
+    """
+    global MODEL
+    try:
+        from faster_whisper import WhisperModel
+        from faster_whisper.audio import decode_audio
+        from whisper_batch import SAMPLE_RATE, fits_window, supports_batching, transcribe_clips
+        if MODEL is None:
+            MODEL = WhisperModel("small", device="cpu")
+        if not supports_batching(MODEL):
+            return [_transcribe(source, path) for path, source in items]
+        clips = []
+        for path, source in items:
+            try:
+                clips.append(decode_audio(str(source), sampling_rate=SAMPLE_RATE) if isinstance(source, (str, Path))
+                             else source)
+            except Exception:
+                clips.append(None)
+    except Exception:
+        return [{"path": str(path), "error": traceback.format_exc()} for path, _ in items]
+
+    results = [None] * len(items)
+    batch = [i for i, clip in enumerate(clips) if clip is not None and fits_window(clip)]
+    try:
+        for i, (segs, language) in zip(batch, transcribe_clips(MODEL, [clips[i] for i in batch], beam_size=5)):
+            results[i] = make_result(items[i][0], segs, language)
+    except Exception:
+        print('일괄 전사 실패, 파일별로 다시 시도합니다:', traceback.format_exc().strip().splitlines()[-1])
+    for i, (path, source) in enumerate(items):
+        if results[i] is None:
+            results[i] = _transcribe(source if clips[i] is None else clips[i], path)
+    return results
+
+
+def transcribe_packed(windows, guard):
+    """Worker: transcribe [[path, ...], ...] with each inner list packed into one window.
+
+    The window transcripts are split back onto the files by offset
+    (clip_packing); files touched by a segment crossing a clip boundary, and
+    windows of a single file, are transcribed on their own. With batching
+    support the windows of a task, and then the files re-run alone, each
+    share one batched pass. Returns one result per file, in the flattened
+    order of `windows`.
+    """
+    global MODEL
+    try:
+        from faster_whisper import WhisperModel
+        from faster_whisper.audio import decode_audio
+        from clip_packing import SAMPLE_RATE, build_window, split_segments
+        from whisper_batch import fits_window, supports_batching, transcribe_clips
+        if MODEL is None:
+            MODEL = WhisperModel("small", device="cpu")
+        batched = supports_batching(MODEL)
+    except Exception:
+        return [{"path": str(p), "error": traceback.format_exc()} for w in windows for p in w]
+
+    paths = [p for w in windows for p in w]
+    clips = []
+    for p in paths:
+        try:
+            clips.append(decode_audio(str(p), sampling_rate=SAMPLE_RATE))
+        except Exception:
+            clips.append(None)
+    results = [None] * len(paths)
+    alone = set()   # indices into `paths` transcribed on their own
+    packed = []     # (first index, spans, buffer) of windows with several files
+    pos = 0
+    for w in windows:
+        idx = range(pos, pos + len(w))
+        pos += len(w)
+        if len(w) == 1 or any(clips[i] is None for i in idx):
+            alone.update(idx)
+            continue
+        buffer, spans = build_window([clips[i] for i in idx], guard)
+        packed.append((idx.start, spans, buffer))
+
+    try:
+        if batched:
+            outputs = transcribe_clips(MODEL, [buffer for _, _, buffer in packed], beam_size=5)
+        else:
+            outputs = []
+            for _, _, buffer in packed:
+                segments, info = MODEL.transcribe(buffer, beam_size=5, condition_on_previous_text=False)
+                outputs.append(([{"start": float(s.start), "end": float(s.end), "text": s.text.strip()}
+                                 for s in segments], getattr(info, "language", "") or ""))
+    except Exception:
+        print('묶음 전사 실패, 파일별로 다시 시도합니다:', traceback.format_exc().strip().splitlines()[-1])
+        outputs = None
+    for n, (first, spans, _) in enumerate(packed):
+        if outputs is None:
+            alone.update(range(first, first + len(spans)))
+            continue
+        segs, language = outputs[n]
+        per_clip, rerun = split_segments(segs, spans)
+        for k, clip_segs in enumerate(per_clip):
+            if k in rerun:
+                alone.add(first + k)
+            else:
+                results[first + k] = make_result(paths[first + k], clip_segs, language if clip_segs else "")
+
+    if batched:
+        short = [i for i in sorted(alone) if clips[i] is not None and fits_window(clips[i])]
+        try:
+            for i, (segs, language) in zip(short, transcribe_clips(MODEL, [clips[i] for i in short], beam_size=5)):
+                results[i] = make_result(paths[i], segs, language)
+        except Exception:
+            print('일괄 전사 실패, 파일별로 다시 시도합니다:', traceback.format_exc().strip().splitlines()[-1])
+    for i in sorted(alone):
+        if results[i] is None:
+            results[i] = _transcribe(str(paths[i]) if clips[i] is None else clips[i], paths[i])
+    return results
+
+
+def clip_duration(path):
+    """Duration in seconds from the file header, or None if it can't be read cheaply."""
+    try:
+        if str(path).lower().endswith('.wav'):
+            import wave
+            with wave.open(str(path), 'rb') as w:
+                return w.getnframes() / float(w.getframerate())
+        import soundfile
+        return soundfile.info(str(path)).duration
+    except Exception:
+        return None
+
+
 def format_timestamp(seconds: float) -> str:
     ms = int(round(seconds * 1000))
     h = ms // 3600000
@@ -282,11 +482,22 @@ def make_srt(segments):
     return "\n".join(lines)
 
 
+AUDIO_EXTS = ('.wav', '.flac')   # .flac: convert_wem.py --format flac
+
+
 def find_wavs(input_dir):
     for root, dirs, files in os.walk(input_dir):
+        # x.wav and x.flac would both write x.srt; take the first extension in AUDIO_EXTS
+        seen = {}
         for f in files:
-            if f.lower().endswith('.wav'):
-                yield Path(root) / f
+            stem, ext = os.path.splitext(f)
+            ext = ext.lower()
+            if ext in AUDIO_EXTS:
+                prev = seen.get(stem)
+                if prev is None or AUDIO_EXTS.index(ext) < AUDIO_EXTS.index(os.path.splitext(prev)[1].lower()):
+                    seen[stem] = f
+        for f in seen.values():
+            yield Path(root) / f
 
 
 def write_tsv_line(tsv_path, row):
@@ -299,6 +510,156 @@ def safe_text_for_tsv(text: str) -> str:
     return text.replace('\t', ' ').replace('\n', ' ').replace('\r', ' ').strip()
 
 
+def write_result(res, input_dir, tsv_path, path=None):
+    """Write the .srt and TSV row for a transcription result; returns the relative path.
+
+    `path` writes the same result for another file with identical audio
+    (content store duplicates); default is the transcribed file itself.
+    """
+    path = str(path or res['path'])
+    rel = os.path.relpath(path, start=str(input_dir))
+    filename = os.path.basename(path)
+
+    if res['classification'] == 'Voice' and res['subtitles']:
+        srt_text = make_srt(res['segments'])
+        srt_path = Path(path).with_suffix('.srt')
+        with open(srt_path, 'w', encoding='utf-8') as fh:
+            fh.write(srt_text)
+        language = res.get('language', '')
+        subtitles = safe_text_for_tsv(res['subtitles'])
+    else:
+        language = ''
+        subtitles = ''
+
+    row = [filename, rel.replace('\\', '/'), res['classification'], language, subtitles]
+    write_tsv_line(tsv_path, row)
+    return rel
+
+
+def handle_result(res, src_idx, total, src_path, input_dir, tsv_path, fan_out):
+    """Write one finished result (and its duplicates) and print the progress line."""
+    if 'error' in res:
+        print('파일 처리 실패:', src_path)
+        print(res['error'])
+        return
+    rel = write_result(res, input_dir, tsv_path)
+    for dup in fan_out.get(src_path, ()):
+        write_result(res, input_dir, tsv_path, path=dup)
+    RUN_STATS['done'] += 1
+    print(f'[{src_idx}/{total}] 완료: {rel}')
+
+
+def run_speech_gate(to_process, total, input_dir, tsv_path, fan_out, args):
+    """--vad-gate: label obvious SFX/silence without Whisper; returns (files for Whisper, GateReport)."""
+    from speech_gate import GateReport, GateThresholds, analyse
+    thresholds = GateThresholds(args.vad_silence_db, args.vad_relative_db, args.vad_max_flatness,
+                                args.vad_max_zcr, args.vad_min_voiced, args.vad_min_voiced_seconds)
+    report = GateReport(audit=args.vad_audit)
+    started = time.perf_counter()
+    # memory-mapped reads plus NumPy (which releases the GIL) overlap well on threads
+    with ThreadPoolExecutor(max_workers=max(1, args.decode_workers)) as pool:
+        infos = list(pool.map(lambda item: analyse(item[1], thresholds), to_process))
+    keep = []
+    for (idx, p), info in zip(to_process, infos):
+        if report.decide(p, info):
+            keep.append((idx, p))
+        else:
+            handle_result(make_result(p, [], ''), idx, total, p, input_dir, tsv_path, fan_out)
+    print(f'음성 사전 분류: {len(to_process)}개 분석 ({time.perf_counter() - started:.1f}초), '
+          f'Whisper 전사 {len(keep)}개')
+    return keep, report
+
+
+def run_wem_pipeline(exe, input_dir, tsv_path, workers, args):
+    """--from-wem: decode .wem files in this process and feed samples to the Whisper workers.
+
+    WAVs are only written with --write-wav; the TSV/.srt then refer to the
+    .wav, otherwise to the .wem itself.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from wem_pipeline import iter_decoded
+
+    files = sorted(Path(r) / f for r, _, fs in os.walk(input_dir) for f in fs if f.lower().endswith('.wem'))
+    total = len(files)
+    if not files:
+        print('처리할 wem 파일이 없습니다.')
+        return
+    jobs = []
+    for idx, p in enumerate(files, start=1):
+        if p.with_suffix('.srt').exists():
+            print(f'[{idx}/{total}] 이미 처리되어 스킵: {p}')
+            continue
+        wav = p.with_suffix('.wav') if args.write_wav else None
+        jobs.append(((idx, wav or p), str(p), str(wav) if wav else None))
+    if not jobs:
+        print('처리할 새 파일이 없습니다.')
+        return
+    fan_out = {}
+    if args.dedup_db and Path(args.dedup_db).exists():
+        from content_store import group_duplicates
+        unique, wem_fan_out = group_duplicates(args.dedup_db, [j[1] for j in jobs])
+        keep = set(unique)
+        key_of = {j[1]: j[0][1] for j in jobs}
+        fan_out = {key_of[rep]: [key_of[d] for d in dups] for rep, dups in wem_fan_out.items()}
+        jobs = [j for j in jobs if j[1] in keep]
+        print(f'중복 제거: 고유 {len(jobs)}개 전사, 중복 {sum(len(v) for v in fan_out.values())}개는 결과 복사')
+
+    # a bounded number of decoded clips (or batches of them) waits for (or
+    # sits in) the Whisper workers
+    batch_size = max(1, args.batch_size)
+    max_inflight = workers * 2
+    print(f'WEM 파이프라인: 디코드 스레드 {args.decode_workers}개, 대기열 최대 {max_inflight}개'
+          f'{f" (배치당 {batch_size}개)" if batch_size > 1 else ""}{", WAV 저장" if args.write_wav else ""}')
+    inflight = {}
+    # fork the Whisper workers now, before any decode thread exists: a worker
+    # forked while a thread has a subprocess pipe open keeps it from closing
+    exe.submit(os.getpid)
+
+    def collect(block):
+        if block:
+            done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+        else:
+            done = [f for f in inflight if f.done()]
+        for fut in done:
+            batch = inflight.pop(fut)
+            try:
+                results = fut.result()
+            except Exception as e:
+                for _, src_path in batch:
+                    print('작업 중 오류:', src_path, e)
+                continue
+            if isinstance(results, dict):
+                results = [results]
+            for (src_idx, src_path), res in zip(batch, results):
+                handle_result(res, src_idx, total, src_path, input_dir, tsv_path, fan_out)
+
+    def submit(batch):
+        while len(inflight) >= max_inflight:
+            collect(block=True)
+        if batch_size > 1:
+            fut = exe.submit(transcribe_batch, [(src_path, samples) for _, src_path, samples in batch])
+        else:
+            fut = exe.submit(transcribe_audio, batch[0][1], batch[0][2])
+        inflight[fut] = [(src_idx, src_path) for src_idx, src_path, _ in batch]
+
+    pending = []
+    for (src_idx, src_path), samples, err in iter_decoded(jobs, args.site_packages, args.decode_workers,
+                                                          max_pending=max_inflight * batch_size):
+        if err is not None:
+            print(f'[{src_idx}/{total}] 디코드 실패: {src_path}: {err}')
+            continue
+        pending.append((src_idx, src_path, samples))
+        del samples
+        if len(pending) >= batch_size:
+            submit(pending)
+            pending = []
+        collect(block=False)
+    if pending:
+        submit(pending)
+    while inflight:
+        collect(block=True)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--input', '-i', default='input', help='input folder (recursive)')
@@ -307,8 +668,51 @@ def main():
     parser.add_argument('--device', default='cpu', choices=['cpu', 'cuda'], help='device to run model on')
     parser.add_argument('--runtime', default=None, help='path to external runtime folder to use (adds its site-packages and DLL paths)')
     parser.add_argument('--compute_type', default=None, help='compute_type passed to faster-whisper (e.g., int8_float16)')
-    parser.add_argument('--workers', type=int, default=0, help='number of worker processes (default: cpu_count-1)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of worker processes (default: usable cores / threads per worker)')
+    parser.add_argument('--dedup-db', default=None,
+                        help='content store written by unpack_pck.py --dedup; transcribe each unique payload once')
+    parser.add_argument('--from-wem', action='store_true',
+                        help='decode .wem files directly and pass the audio to Whisper in memory (no .wav needed)')
+    parser.add_argument('--site-packages', default=os.path.join('runtime', 'Lib', 'site-packages'),
+                        help='vgmstream location for --from-wem (as in convert_wem.py)')
+    parser.add_argument('--decode-workers', type=int, default=2, help='decoder threads for --from-wem')
+    parser.add_argument('--write-wav', action='store_true', help='with --from-wem, also write the decoded .wav files')
+    parser.add_argument('--pack', action='store_true',
+                        help='pack consecutive short files into shared 30 s windows and split the transcript back')
+    parser.add_argument('--pack-guard', type=float, default=1.0,
+                        help='seconds of silence between packed files (default 1.0)')
+    parser.add_argument('--shared-model', action='store_true',
+                        help='load the model once in this process and run --workers inference threads on it')
+    parser.add_argument('--cpu-threads', type=int, default=0,
+                        help='CTranslate2 threads per worker (default: planned so workers x threads = usable cores)')
+    parser.add_argument('--pin-cpus', action='store_true',
+                        help='pin each worker process to its own set of --cpu-threads cores (Linux)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='clips per batched Whisper pass (default 1: one file at a time); 8-16 suits short voice lines')
+    parser.add_argument('--vad-gate', action='store_true',
+                        help='label silent/noise-like .wav files as SFX with a cheap NumPy check instead of Whisper')
+    parser.add_argument('--vad-silence-db', type=float, default=-45.0,
+                        help='with --vad-gate, frames quieter than this (dBFS) are silence (default -45)')
+    parser.add_argument('--vad-relative-db', type=float, default=30.0,
+                        help='with --vad-gate, frames this far below the loudest frame are silence (default 30)')
+    parser.add_argument('--vad-max-flatness', type=float, default=0.35,
+                        help='with --vad-gate, spectral flatness above this is noise, not voice (default 0.35)')
+    parser.add_argument('--vad-max-zcr', type=float, default=3500.0,
+                        help='with --vad-gate, zero crossings per second above this are not voice (default 3500)')
+    parser.add_argument('--vad-min-voiced', type=float, default=0.1,
+                        help='with --vad-gate, minimum share of voiced frames among loud ones (default 0.1)')
+    parser.add_argument('--vad-min-voiced-seconds', type=float, default=0.15,
+                        help='with --vad-gate, minimum voiced audio in seconds (default 0.15)')
+    parser.add_argument('--vad-audit', type=float, default=0.0,
+                        help='with --vad-gate, share of gated files sent to Whisper anyway to estimate misses (e.g. 0.05)')
     args = parser.parse_args()
+    if args.from_wem and args.pack:
+        # the in-memory pipeline batches decoded clips itself; packing needs the .wav files
+        parser.error('--pack cannot be combined with --from-wem')
+    if args.from_wem and args.vad_gate:
+        # the gate memory-maps .wav files on disk
+        parser.error('--vad-gate cannot be combined with --from-wem')
 
     # detect/use external runtime (e.g., GPT-SoVITS runtime) before ensuring deps
     if detect_and_use_known_runtime(args.runtime):
@@ -339,15 +743,35 @@ def main():
         with open(tsv_path, 'w', encoding='utf-8') as fh:
             fh.write('파일명\t상대경로\t분류\t언어\t자막\n')
 
-    cpu_count = max(1, multiprocessing.cpu_count() - 1)
-    workers = args.workers or cpu_count
-    if args.device == 'cuda' and workers > 1:
+    # workers x CTranslate2 threads per worker = usable cores (affinity mask, cgroup quota)
+    from cpu_plan import available_cores, plan_cpus
+    cores, core_source = available_cores()
+    workers, args.cpu_threads = plan_cpus(cores, args.workers, args.cpu_threads)
+    if args.device == 'cuda' and workers > 1 and not args.shared_model:
         # recommend single worker for GPU to avoid contention, but allow user override
         print('GPU 사용시 멀티프로세스는 메모리/장치 경쟁이 발생할 수 있습니다. 자동으로 worker=1로 설정합니다.')
         workers = 1
+    print(f'CPU 계획: {core_source} -> 워커 {workers}개 x 추론 스레드 {args.cpu_threads}개'
+          f' = {workers * args.cpu_threads}')
+    if workers * args.cpu_threads > cores:
+        print(f'경고: 워커 x 스레드({workers * args.cpu_threads})가 사용 가능한 코어({cores})보다 많습니다.')
 
     print(f'작업 스레드(프로세스) 수: {workers}')
 
+    started = time.perf_counter()
+    if args.from_wem:
+        try:
+            with make_executor(args, workers) as exe:
+                try:
+                    run_wem_pipeline(exe, input_dir, tsv_path, workers, args)
+                except KeyboardInterrupt:
+                    print('\n중단 요청 감지: 진행 중인 작업을 취소합니다...')
+                    exe.shutdown(wait=False, cancel_futures=True)
+            report_throughput(started, args, workers)
+        except KeyboardInterrupt:
+            print('메인에서 중단되었습니다.')
+        return
+
     files = list(find_wavs(input_dir))
     total = len(files)
     if not files:
@@ -367,48 +791,65 @@ def main():
         print('처리할 새 파일이 없습니다.')
         return
 
-    # Start process pool
+    # Identical audio (same .wem payload in the content store) is transcribed once
+    fan_out = {}
+    if args.dedup_db and Path(args.dedup_db).exists():
+        from content_store import group_duplicates
+        unique, fan_out = group_duplicates(args.dedup_db, [p for _, p in to_process],
+                                           key=lambda p: p.with_suffix('.wem'))
+        keep = set(unique)
+        to_process = [(idx, p) for idx, p in to_process if p in keep]
+        print(f'중복 제거: 고유 {len(to_process)}개 전사, 중복 {sum(len(v) for v in fan_out.values())}개는 결과 복사')
+
+    gate = None
+    if args.vad_gate:
+        to_process, gate = run_speech_gate(to_process, total, input_dir, tsv_path, fan_out, args)
+
+    # Start process pool (or the threads sharing one model)
     try:
-        with ProcessPoolExecutor(max_workers=workers, initializer=init_model, initargs=(args.model, args.device, args.compute_type)) as exe:
-            futures = {exe.submit(transcribe_file, p): (idx, p) for idx, p in to_process}
+        with make_executor(args, workers) as exe:
+            if args.pack:
+                from clip_packing import pack_windows
+                paths = [p for _, p in to_process]
+                windows = [[to_process[i] for i in w]
+                           for w in pack_windows([clip_duration(p) for p in paths], guard=args.pack_guard)]
+                per_task = max(1, args.batch_size)
+                print(f'묶음 전사: 파일 {len(paths)}개 -> 창 {len(windows)}개 (작업당 {per_task}개 창)')
+                tasks = [windows[i:i + per_task] for i in range(0, len(windows), per_task)]
+                futures = {exe.submit(transcribe_packed, [[p for _, p in w] for w in t], args.pack_guard):
+                           [item for w in t for item in w] for t in tasks}
+            elif args.batch_size > 1:
+                print(f'일괄 전사: 배치당 최대 {args.batch_size}개')
+                batches = [to_process[i:i + args.batch_size] for i in range(0, len(to_process), args.batch_size)]
+                futures = {exe.submit(transcribe_batch, [(p, p) for _, p in b]): b for b in batches}
+            else:
+                futures = {exe.submit(transcribe_file, p): [(idx, p)] for idx, p in to_process}
             try:
                 for fut in as_completed(futures):
-                    src_idx, src_path = futures[fut]
+                    batch = futures[fut]
                     try:
-                        res = fut.result()
+                        results = fut.result()
                     except KeyboardInterrupt:
                         raise
                     except Exception as e:
-                        print('작업 중 오류:', src_path, e)
+                        for _, src_path in batch:
+                            print('작업 중 오류:', src_path, e)
                         continue
-
-                    if 'error' in res:
-                        print('파일 처리 실패:', src_path)
-                        print(res['error'])
-                        continue
-
-                    rel = os.path.relpath(res['path'], start=str(input_dir))
-                    filename = os.path.basename(res['path'])
-
-                    if res['classification'] == 'Voice' and res['subtitles']:
-                        srt_text = make_srt(res['segments'])
-                        srt_path = Path(res['path']).with_suffix('.srt')
-                        with open(srt_path, 'w', encoding='utf-8') as fh:
-                            fh.write(srt_text)
-                        language = res.get('language', '')
-                        subtitles = safe_text_for_tsv(res['subtitles'])
-                    else:
-                        language = ''
-                        subtitles = ''
-
-                    row = [filename, rel.replace('\\', '/'), res['classification'], language, subtitles]
-                    write_tsv_line(tsv_path, row)
-                    print(f'[{src_idx}/{total}] 완료: {rel}')
+                    if isinstance(results, dict):
+                        results = [results]
+                    for (src_idx, src_path), res in zip(batch, results):
+                        handle_result(res, src_idx, total, src_path, input_dir, tsv_path, fan_out)
+                        if gate is not None and 'error' not in res:
+                            gate.observe(src_path, res['classification'])
             except KeyboardInterrupt:
                 print('\n중단 요청 감지: 진행 중인 작업을 취소합니다...')
                 # Attempt to cancel running futures and shutdown pool
                 exe.shutdown(wait=False, cancel_futures=True)
                 print('모든 워커에 중단 신호를 보냈습니다.')
+        if gate is not None:
+            for line in gate.lines():
+                print(line)
+        report_throughput(started, args, workers)
     except KeyboardInterrupt:
         print('메인에서 중단되었습니다.')
 
@@ -0,0 +1,147 @@
+"""unpack_manifest.py
+
+SQLite manifest for incremental PCK unpacking.
+
+Each .pck is keyed by (size, mtime, header hash). A PCK is skipped only when
+its key is unchanged and the previous run marked it finished; a changed PCK is
+extracted again, and a PCK left 'partial' by a crash resumes from the entries
+that were already written.
+"""
+
+import hashlib
+import sqlite3
+import struct
+import time
+from pathlib import Path
+
+MANIFEST_NAME = 'unpack_manifest.sqlite'
+
+# Hash at most this much of the AKPK header (the lookup tables describe every
+# entry's size and offset, so a content change almost always shows up here).
+HEADER_HASH_LIMIT = 16 * 1024 * 1024
+FALLBACK_HASH_BYTES = 64 * 1024
+
+# Commit recorded entries in batches; on a crash the uncommitted ones are
+# simply written again.
+COMMIT_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pcks (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    header_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    pck TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (pck, name)
+);
+-- entries written for an older version of the pck, kept until the new one is done
+CREATE TABLE IF NOT EXISTS stale (
+    pck TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (pck, name)
+);
+"""
+
+
+def fingerprint(pck_path: Path) -> tuple:
+    """Return (size, mtime_ns, header_hash) for a .pck file."""
+    st = pck_path.stat()
+    h = hashlib.blake2b(digest_size=16)
+    with open(pck_path, 'rb') as fh:
+        head = fh.read(8)
+        h.update(head)
+        if len(head) == 8 and head[:4] == b'AKPK':
+            header_size = struct.unpack('<I', head[4:8])[0]
+            h.update(fh.read(min(header_size, HEADER_HASH_LIMIT)))
+        else:
+            h.update(fh.read(FALLBACK_HASH_BYTES))
+    return st.st_size, st.st_mtime_ns, h.hexdigest()
+
+
+def _key(pck_path) -> str:
+    return str(Path(pck_path).resolve())
+
+
+class UnpackManifest:
+    """One connection to the manifest database (open one per worker)."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=60)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._pending = 0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def lookup(self, pck_path: Path):
+        """Return ((size, mtime_ns, header_hash), status) or None."""
+        row = self._conn.execute(
+            'SELECT size, mtime_ns, header_hash, status FROM pcks WHERE path = ?',
+            (_key(pck_path),)).fetchone()
+        if row is None:
+            return None
+        return tuple(row[:3]), row[3]
+
+    def begin(self, pck_path: Path, key: tuple):
+        """Mark `pck_path` as in progress; returns (done, stale) sets of entry names.
+
+        `done` are entries already written for this same file (same key).
+        When the file changed, the PCK is extracted from scratch and the
+        entries recorded for the old version move to `stale`; they stay there
+        (across failed or interrupted runs) until finish(), so the caller can
+        remove the ones the new version no longer has.
+        """
+        path = _key(pck_path)
+        prev = self.lookup(pck_path)
+        if prev is None or prev[0] != tuple(key):
+            self._conn.execute('INSERT OR IGNORE INTO stale (pck, name) SELECT pck, name FROM entries WHERE pck = ?',
+                               (path,))
+            self._conn.execute('DELETE FROM entries WHERE pck = ?', (path,))
+        done = {r[0] for r in self._conn.execute('SELECT name FROM entries WHERE pck = ?', (path,))}
+        stale = {r[0] for r in self._conn.execute('SELECT name FROM stale WHERE pck = ?', (path,))}
+        self._conn.execute(
+            'INSERT OR REPLACE INTO pcks (path, size, mtime_ns, header_hash, status, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (path, *key, 'partial', time.time()))
+        self._conn.commit()
+        return done, stale
+
+    def adopt(self, pck_path: Path, key: tuple):
+        """Record an output folder unpacked before the manifest existed as done."""
+        self._conn.execute(
+            'INSERT OR REPLACE INTO pcks (path, size, mtime_ns, header_hash, status, updated) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (_key(pck_path), *key, 'done', time.time()))
+        self._conn.commit()
+
+    def record(self, pck_path: Path, name: str):
+        """Remember that entry `name` of `pck_path` is fully written."""
+        self._conn.execute('INSERT OR IGNORE INTO entries (pck, name) VALUES (?, ?)', (_key(pck_path), str(name)))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def finish(self, pck_path: Path):
+        self._conn.execute('UPDATE pcks SET status = ?, updated = ? WHERE path = ?',
+                           ('done', time.time(), _key(pck_path)))
+        self._conn.execute('DELETE FROM stale WHERE pck = ?', (_key(pck_path),))
+        self._conn.commit()
+        self._pending = 0
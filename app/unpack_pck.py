@@ -1,9 +1,18 @@
 import os
 import sys
+import time
+import shutil
 import argparse
 from pathlib import Path
 import multiprocessing
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from pck_reader import PCKReader, is_bnk, iter_bnk_media
+from pck_index import INDEX_NAME, build_index
+from content_store import STORE_NAME, ContentStore
+from entry_writer import DEFAULT_QUEUE_BYTES, AsyncEntryWriter, EntryWriter
+from unpack_manifest import MANIFEST_NAME, UnpackManifest, fingerprint
+from scheduler import BudgetScheduler, parse_size
 
 HERE = Path(__file__).resolve().parent
 ROOT = HERE.parent
@@ -95,58 +104,335 @@ def find_pcks(input_dir: Path):
                 yield Path(root) / f
 
 
-def unpack_one(pck_path: Path, out_base: Path, PCKextract, BNK):
+def _output_path(filepath, pck_path: Path, outdir: Path) -> Path:
+    """Map an extractor-relative path onto `outdir`."""
+    path_to_write = Path(filepath)
+    if not path_to_write.is_absolute():
+        parts = list(path_to_write.parts)
+        # remove any number of leading common prefixes produced by extractor
+        while parts and parts[0] in (pck_path.name, pck_path.stem, 'input'):
+            parts.pop(0)
+        # if nothing left, use filename
+        if parts:
+            path_to_write = outdir.joinpath(*parts)
+        else:
+            path_to_write = outdir / pck_path.stem
+    return path_to_write
+
+
+def extract_bnk_media(bnk_path: Path, data, BNK=None, writer=None) -> int:
+    """Write the WEMs embedded in an in-memory soundbank to `<bank>_bnk/`.
+
+    The bank's DIDX index is used to slice DATA directly; HoyoAudioTools' BNK
+    is only used when our parser rejects the bank.
+    """
+    bnk_out = Path(str(bnk_path.with_suffix('')) + '_bnk')
+    try:
+        media = list(iter_bnk_media(data))
+    except ValueError:
+        if BNK is None:
+            return 0
+        bnkObj = BNK(bytes=bytes(data))
+        if bnkObj.data.get('DATA') is None:
+            return 0
+        bnk_out.mkdir(parents=True, exist_ok=True)
+        bnkObj.extract('all', str(bnk_out))
+        return len(bnkObj.data.get('DIDX') or ())
+
+    writer = writer or EntryWriter()
+    for wem_id, _offset, _length, view in media:
+        writer.write(bnk_out / f'{wem_id}.wem', view)
+    return len(media)
+
+
+def _write_result(name, data, pck_path: Path, outdir: Path, BNK, writer, on_written=None):
+    """Queue one extractor result; soundbanks also get their media unpacked.
+
+    `on_written(name)` runs once the entry (and a bank's media) is on disk.
+    """
+    path_to_write = _output_path(name, pck_path, outdir)
+    done = (lambda: on_written(name)) if on_written else None
+    if not is_bnk(name, data):
+        writer.write(path_to_write, data, done)
+        return
+    failed = writer.failed
+    writer.write(path_to_write, data)
+    try:
+        extract_bnk_media(path_to_write, data, BNK, writer)
+    except Exception:
+        pass
+    if done:
+        # record the bank only if no write failed meanwhile (its media included), so a retry redoes it
+        writer.after(lambda: writer.failed == failed and done())
+
+
+def extract_streaming(pck_path: Path, outdir: Path, BNK=None, skip=(), on_written=None, writer=None):
+    """Copy every entry of `pck_path` to `outdir` straight from the mapped archive.
+
+    Entries whose name is in `skip` were written by an earlier run and are left
+    alone; `on_written(name)` is called after each entry is on disk. Raises
+    ValueError if the archive can't be parsed so the caller can fall back to
+    HoyoAudioTools.
+    """
+    writer = writer or EntryWriter()
+    with PCKReader(pck_path) as reader:
+        for name, _offset, _length, data in reader.iter_entries():
+            if name in skip:
+                continue
+            _write_result(name, data, pck_path, outdir, BNK, writer, on_written)
+        # queued views point into the map; finish them before it is closed
+        writer.flush()
+
+
+def extract_with_hoyo(pck_path: Path, outdir: Path, PCKextract, BNK=None, skip=(), on_written=None, writer=None):
+    """Extract through HoyoAudioTools (loads the whole archive in memory)."""
+    allFiles = PCKextract(str(pck_path), str(outdir)).extract()
+    writer = writer or EntryWriter()
+
+    # write files returned by extractor
+    for filepath, data in allFiles.items():
+        if filepath in skip:
+            continue
+        _write_result(filepath, data, pck_path, outdir, BNK, writer, on_written)
+    writer.flush()
+
+
+def remove_stale_entries(names, pck_path: Path, outdir: Path) -> int:
+    """Delete the output files of entry `names` (and a soundbank's `_bnk/` media); returns files removed."""
+    removed = 0
+    for name in names:
+        path = _output_path(name, pck_path, outdir)
+        bnk_out = Path(str(path.with_suffix('')) + '_bnk')
+        if bnk_out.is_dir():
+            removed += sum(1 for p in bnk_out.rglob('*') if p.is_file())
+            shutil.rmtree(bnk_out, ignore_errors=True)
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _stats(writer=None, elapsed: float = 0.0) -> dict:
+    """Per-PCK counters returned next to (ok, msg) for the run summary."""
+    if writer is None:
+        return {'entries': 0, 'bytes': 0, 'parse': 0.0, 'write': 0.0}
+    return {'entries': writer.written, 'bytes': writer.bytes_written,
+            'parse': max(0.0, elapsed - writer.wait_time), 'write': writer.write_time}
+
+
+def unpack_one(pck_path: Path, out_base: Path, PCKextract, BNK, reader: str = 'auto', manifest=None, dedup=None,
+               write_mode: str = 'async', queue_bytes: int = DEFAULT_QUEUE_BYTES):
+    """Unpack one .pck beside itself. Returns (ok, message, stats).
+
+    Without `manifest` an existing output folder means "already unpacked".
+    With a manifest path the PCK is skipped only if it is unchanged and was
+    finished before; an interrupted PCK resumes at entry level. An output folder
+    the manifest doesn't know yet (unpacked by an older version) is adopted as
+    finished rather than extracted again. With a `dedup` store path, .wem
+    payloads already extracted elsewhere are hard linked.
+    `write_mode` 'async' writes on a separate thread (at most `queue_bytes`
+    queued) while parsing continues; 'sync' writes inline.
+    `stats` holds entries, bytes, parse and write seconds.
+    """
+    mf = None
+    store = None
+    writer = None
     try:
         # Create output folder beside the .pck file with same name (without extension)
         outdir = pck_path.with_suffix('')
-        if outdir.exists():
-            # already unpacked (or folder exists) -> skip
-            return True, f'스킵: {pck_path} -> {outdir}'
+        done = set()
+        stale = set()
+        written = set()
+        on_written = None
+        if manifest is None:
+            if outdir.exists():
+                # already unpacked (or folder exists) -> skip
+                return True, f'스킵: {pck_path} -> {outdir}', _stats()
+        else:
+            mf = UnpackManifest(manifest)
+            key = fingerprint(pck_path)
+            prev = mf.lookup(pck_path)
+            if prev == (key, 'done') and outdir.exists():
+                return True, f'스킵: {pck_path} -> {outdir}', _stats()
+            if prev is None and outdir.exists():
+                # unpacked before the manifest existed: keep the old "folder exists" rule once
+                mf.adopt(pck_path, key)
+                return True, f'스킵: {pck_path} -> {outdir} (기존 폴더를 매니페스트에 등록)', _stats()
+            done, stale = mf.begin(pck_path, key)
+
+            def on_written(name):
+                written.add(name)
+                mf.record(pck_path, name)
         outdir.mkdir(parents=True, exist_ok=True)
+        if dedup is not None:
+            store = ContentStore(dedup)
+        if write_mode == 'async':
+            writer = AsyncEntryWriter(store, max_queued_bytes=queue_bytes)
+        else:
+            writer = EntryWriter(store)
 
-        allFiles = PCKextract(str(pck_path), str(outdir)).extract()
+        start = time.perf_counter()
+        streamed = False
+        if reader in ('auto', 'mmap'):
+            try:
+                extract_streaming(pck_path, outdir, BNK, done, on_written, writer)
+                streamed = True
+            except ValueError:
+                # not a layout the mmap reader understands -> HoyoAudioTools
+                if reader == 'mmap' or PCKextract is None:
+                    raise
+        if not streamed:
+            if PCKextract is None:
+                raise RuntimeError('HoyoAudioTools를 사용할 수 없습니다')
+            extract_with_hoyo(pck_path, outdir, PCKextract, BNK, done, on_written, writer)
+        writer.close()
+        stats = _stats(writer, time.perf_counter() - start)
 
-        # write files returned by extractor
-        for filepath, data in allFiles.items():
+        if store is not None:
+            # the store must be committed before the manifest says "done"
+            store.close()
+        note = f' (파싱 {stats["parse"]:.2f}초, 쓰기 {stats["write"]:.2f}초)'
+        if writer.failed:
+            # left 'partial': the next run retries only the entries that weren't written
+            return False, f'{pck_path}: 쓰기 실패 {writer.failed}개, 다음 실행에서 재시도합니다{note}', stats
+        if stale:
+            # the PCK changed since the last run: drop entries its new version doesn't have
+            removed = remove_stale_entries(stale - written - done, pck_path, outdir)
+            if removed:
+                note += f' (이전 버전 항목 {removed}개 삭제)'
+        if mf is not None:
+            mf.finish(pck_path)
+        if store is not None and store.linked:
+            note += f' (중복 {store.linked}개 링크, {store.saved_bytes / 1048576:.1f} MB 절약)'
+        if done:
+            return True, f'재개 완료: {pck_path} -> {outdir} (이전에 쓴 항목 {len(done)}개 건너뜀){note}', stats
+        return True, f'완료: {pck_path} -> {outdir}{note}', stats
+    except Exception as e:
+        return False, f'{pck_path}: {e}', _stats(writer)
+    finally:
+        if writer is not None:
             try:
-                path_to_write = Path(filepath)
-                if not path_to_write.is_absolute():
-                    parts = list(path_to_write.parts)
-                    # remove any number of leading common prefixes produced by extractor
-                    while parts and parts[0] in (pck_path.name, pck_path.stem, 'input'):
-                        parts.pop(0)
-                    # if nothing left, use filename
-                    if parts:
-                        path_to_write = outdir.joinpath(*parts)
-                    else:
-                        path_to_write = outdir / pck_path.stem
-                path_to_write.parent.mkdir(parents=True, exist_ok=True)
-                with open(path_to_write, 'wb') as fh:
-                    fh.write(data)
+                writer.close()
             except Exception:
-                # skip writing this file but continue
-                continue
+                pass
+        for db in (store, mf):
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
 
-        # handle any .bnk inside returned files by extracting their wems
-        # scan written files for .bnk
-        for root, dirs, files in os.walk(outdir):
-            for f in files:
-                if f.lower().endswith('.bnk'):
-                    bnk_path = Path(root) / f
-                    try:
-                        with open(bnk_path, 'rb') as bf:
-                            bdata = bf.read()
-                        bnkObj = BNK(bytes=bdata)
-                        if bnkObj.data.get('DATA') is not None:
-                            bnk_out = bnk_path.with_suffix('')
-                            bnk_out = Path(str(bnk_out) + '_bnk')
-                            bnk_out.mkdir(parents=True, exist_ok=True)
-                            bnkObj.extract('all', str(bnk_out))
-                    except Exception:
-                        continue
-        return True, f'완료: {pck_path} -> {outdir}'
-    except Exception as e:
-        return False, f'{pck_path}: {e}'
+
+# Per-process extractor classes for the process pool (set by _init_worker)
+_WORKER_TOOLS = (None, None)
+
+
+def _init_worker(runtime_path):
+    """Process pool initializer: load HoyoAudioTools once per worker."""
+    global _WORKER_TOOLS
+    try:
+        _WORKER_TOOLS = ensure_hoyo_tools(runtime_path)
+    except Exception:
+        # main() already reported this; only the mmap reader can run without it
+        _WORKER_TOOLS = (None, None)
+
+
+def _unpack_in_worker(pck_path: str, out_base: str, reader: str, manifest, dedup, write_mode, queue_bytes):
+    """Process pool task: only paths go in and an (ok, msg, stats) tuple comes out."""
+    PCKextract, BNK = _WORKER_TOOLS
+    return unpack_one(Path(pck_path), Path(out_base), PCKextract, BNK, reader, manifest, dedup,
+                      write_mode, queue_bytes)
+
+
+def run_index_only(input_dir: Path, index_path: Path):
+    """Build the coordinate index for every .pck under `input_dir`."""
+    files = list(find_pcks(input_dir))
+    if not files:
+        print('처리할 pck 파일이 없습니다.', flush=True)
+        return
+    print(f'발견된 pck 파일: {len(files)}, 색인: {index_path}', flush=True)
+    total = len(files)
+    entries = 0
+    start = time.perf_counter()
+    for done, (pck_path, count, err) in enumerate(build_index(files, index_path), start=1):
+        if err is not None:
+            print(f'[{done}/{total}] 오류: {pck_path}: {err}', flush=True)
+        elif count is None:
+            print(f'[{done}/{total}] 스킵(변경 없음): {pck_path}', flush=True)
+        else:
+            entries += count
+            print(f'[{done}/{total}] 색인: {pck_path} ({count}개 항목)', flush=True)
+    print(f'색인 완료: 항목 {entries}개, {time.perf_counter() - start:.2f}초', flush=True)
+
+
+def estimate_unpack_bytes(pck_path: Path, reader: str, queue_bytes: int) -> int:
+    """Rough peak memory of unpacking one pck, used for scheduling.
+
+    HoyoAudioTools reads the whole archive and keeps every entry as bytes; the
+    mmap reader only holds what is queued for the writer (mapped pages are
+    reclaimable page cache). 'auto' almost always ends up on the mmap path.
+    """
+    try:
+        size = pck_path.stat().st_size
+    except OSError:
+        return 0
+    if reader == 'hoyo':
+        return 2 * size
+    return min(size, queue_bytes)
+
+
+def unpack_all(files, out_base: Path, PCKextract, BNK, workers: int, executor: str = 'thread', runtime=None,
+               reader: str = 'auto', manifest=None, dedup=None, write_mode: str = 'async',
+               queue_bytes: int = DEFAULT_QUEUE_BYTES, memory_budget=None, report=print) -> dict:
+    """Unpack `files` on a thread or process pool, reporting one progress line per pck.
+
+    The largest pcks start first; with `memory_budget` (bytes) a pck is only
+    started while the estimated memory of the running ones stays under it.
+    Returns the summed per-PCK stats plus ok/failed counts, elapsed seconds and
+    worker utilization.
+    """
+    summary = _stats()
+    summary.update(ok=0, failed=0)
+    start = time.perf_counter()
+    total = len(files)
+    done = 0
+    if executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(runtime,))
+        jobs = [(estimate_unpack_bytes(p, reader, queue_bytes), p, _unpack_in_worker,
+                 (str(p), str(out_base), reader, manifest, dedup, write_mode, queue_bytes)) for p in files]
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        jobs = [(estimate_unpack_bytes(p, reader, queue_bytes), p, unpack_one,
+                 (p, out_base, PCKextract, BNK, reader, manifest, dedup, write_mode, queue_bytes)) for p in files]
+    scheduler = BudgetScheduler(workers, memory_budget)
+    with pool as exe:
+        try:
+            for pck_path, fut in scheduler.run(exe, jobs):
+                done += 1
+                try:
+                    ok, msg, stats = fut.result()
+                except Exception as e:
+                    # e.g. a worker process died (BrokenProcessPool)
+                    ok, msg, stats = False, f'{pck_path}: {e}', _stats()
+                for k in stats:
+                    summary[k] += stats[k]
+                summary['ok' if ok else 'failed'] += 1
+                # Normalize message prefix
+                if ok:
+                    report(f'[{done}/{total}] {msg}', flush=True)
+                else:
+                    report(f'[{done}/{total}] 오류: {msg}', flush=True)
+        except KeyboardInterrupt:
+            report('\n중단 요청 감지: 진행 중인 작업을 취소합니다...', flush=True)
+
+    summary['elapsed'] = time.perf_counter() - start
+    summary['utilization'] = scheduler.stats.get('utilization', 0.0)
+    report(f'요약: 항목 {summary["entries"]}개, {summary["bytes"] / 1048576:.1f} MB, 경과 {summary["elapsed"]:.2f}초 '
+           f'(파싱 {summary["parse"]:.2f}초, 쓰기 {summary["write"]:.2f}초, 작업자 합계)', flush=True)
+    report(scheduler.summary(), flush=True)
+    return summary
 
 
 def main():
@@ -155,12 +441,41 @@ def main():
     parser.add_argument('--output', '-o', default='unpacked', help='output base folder')
     parser.add_argument('--runtime', default=None, help='path to external runtime to use')
     parser.add_argument('--workers', type=int, default=0, help='number of worker threads (default: cpu_count)')
+    parser.add_argument('--reader', choices=['auto', 'mmap', 'hoyo'], default='auto',
+                        help='pck reader: mmap streaming, HoyoAudioTools, or mmap with HoyoAudioTools fallback')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help='run workers as threads (shared GIL) or separate processes')
+    parser.add_argument('--manifest', default=None,
+                        help=f'unpack manifest path (default: <input>/{MANIFEST_NAME})')
+    parser.add_argument('--no-manifest', action='store_true',
+                        help='skip any pck whose output folder exists (previous behaviour)')
+    parser.add_argument('--writer', choices=['async', 'sync'], default='async',
+                        help='write entries on a separate writer thread (async) or inline (sync)')
+    parser.add_argument('--write-queue-mb', type=int, default=DEFAULT_QUEUE_BYTES // (1024 * 1024),
+                        help='max MB of entries queued for the async writer per pck')
+    parser.add_argument('--dedup', action='store_true',
+                        help='store identical .wem payloads once and hard link the copies')
+    parser.add_argument('--dedup-db', default=None, help=f'content store path (default: <input>/{STORE_NAME})')
+    parser.add_argument('--index-only', action='store_true',
+                        help='only record entry coordinates into the index; write no audio')
+    parser.add_argument('--index', default=None, help=f'index database path (default: <input>/{INDEX_NAME})')
+    parser.add_argument('--memory-budget', default=None,
+                        help='cap on the estimated memory of pcks unpacked at once, e.g. 2G (default: no cap)')
     args = parser.parse_args()
 
     input_dir = Path(args.input)
     if not input_dir.exists():
         print('입력 폴더가 없습니다:', input_dir, flush=True)
         return
+    try:
+        memory_budget = parse_size(args.memory_budget)
+    except ValueError as e:
+        print(e, flush=True)
+        return
+
+    if args.index_only:
+        run_index_only(input_dir, Path(args.index) if args.index else input_dir / INDEX_NAME)
+        return
 
     out_base = Path(args.output)
     out_base.mkdir(parents=True, exist_ok=True)
@@ -168,8 +483,13 @@ def main():
     try:
         PCKextract, BNK = ensure_hoyo_tools(args.runtime)
     except Exception as e:
-        print('HoyoAudioTools 로드 실패:', e)
-        return
+        if args.reader == 'hoyo':
+            print('HoyoAudioTools 로드 실패:', e, flush=True)
+            sys.exit(1)
+        # the mmap reader and the built-in bnk parser don't need HoyoAudioTools;
+        # with 'auto', pcks it can't parse are reported as failed by unpack_one
+        print('HoyoAudioTools 로드 실패 (mmap 리더로 계속):', e, flush=True)
+        PCKextract, BNK = None, None
 
     files = list(find_pcks(input_dir))
     if not files:
@@ -182,24 +502,23 @@ def main():
         os.environ.setdefault('PYTHONUNBUFFERED', '1')
     except Exception:
         pass
-    print(f'발견된 pck 파일: {len(files)}, 작업 스레드: {workers}', flush=True)
+    manifest = None
+    if not args.no_manifest:
+        manifest = str(Path(args.manifest) if args.manifest else input_dir / MANIFEST_NAME)
+        print(f'언팩 매니페스트: {manifest}', flush=True)
+    dedup = None
+    if args.dedup:
+        dedup = str(Path(args.dedup_db) if args.dedup_db else input_dir / STORE_NAME)
+        print(f'중복 제거 저장소: {dedup}', flush=True)
 
-    results = []
-    total = len(files)
-    done = 0
-    with ThreadPoolExecutor(max_workers=workers) as exe:
-        futures = {exe.submit(unpack_one, p, out_base, PCKextract, BNK): p for p in files}
-        try:
-            for fut in as_completed(futures):
-                done += 1
-                ok, msg = fut.result()
-                # Normalize message prefix
-                if ok:
-                    print(f'[{done}/{total}] {msg}', flush=True)
-                else:
-                    print(f'[{done}/{total}] 오류: {msg}', flush=True)
-        except KeyboardInterrupt:
-            print('\n중단 요청 감지: 진행 중인 작업을 취소합니다...', flush=True)
+    unit = '작업 프로세스' if args.executor == 'process' else '작업 스레드'
+    print(f'발견된 pck 파일: {len(files)}, {unit}: {workers}', flush=True)
+    if memory_budget is not None:
+        print(f'메모리 예산: {memory_budget / 1048576:.0f} MB (큰 파일부터 처리)', flush=True)
+
+    queue_bytes = max(1, args.write_queue_mb) * 1024 * 1024
+    unpack_all(files, out_base, PCKextract, BNK, workers, args.executor, args.runtime, args.reader,
+               manifest, dedup, args.writer, queue_bytes, memory_budget)
 
     # If the provided out_base directory was created but no files were written into it,
     # remove it to avoid leaving an unused 'unpacked' folder behind.
@@ -0,0 +1,220 @@
+"""vgmstream_lib.py
+
+In-process decoding through the libvgmstream shared library (ctypes).
+
+Two generations of the C API are supported:
+  * libvgmstream 2.x: libvgmstream_init / libvgmstream_open_stream /
+    libvgmstream_render, the API exported by current shared builds;
+  * the classic API: init_vgmstream / render_vgmstream / close_vgmstream,
+    exported by older libvgmstream builds.
+
+Samples are rendered as 16-bit PCM straight into a preallocated bytearray and
+returned as a wav_io.PcmAudio, so no subprocess is started per file and other
+stages can use the PCM without going through a .wav on disk.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import sys
+
+from wav_io import PcmAudio
+
+_LIB_NAMES = {
+    'win32': ['libvgmstream.dll', 'vgmstream.dll'],
+    'darwin': ['libvgmstream.dylib'],
+}.get(sys.platform, ['libvgmstream.so'])
+
+# frames rendered per call with the classic API
+RENDER_FRAMES = 32768
+
+# libvgmstream_sfmt_t
+_SFMT_PCM16 = 1
+
+
+class _Decoder(ctypes.Structure):
+    _fields_ = [('buf', ctypes.c_void_p),
+                ('buf_samples', ctypes.c_int),
+                ('buf_bytes', ctypes.c_int),
+                ('done', ctypes.c_bool)]
+
+
+class _Format(ctypes.Structure):
+    # leading fields of libvgmstream_format_t; the rest is never read
+    _fields_ = [('channels', ctypes.c_int),
+                ('sample_rate', ctypes.c_int),
+                ('sample_format', ctypes.c_int),
+                ('sample_size', ctypes.c_int),
+                ('channel_layout', ctypes.c_uint32),
+                ('subsong_index', ctypes.c_int),
+                ('subsong_count', ctypes.c_int),
+                ('input_channels', ctypes.c_int),
+                ('stream_samples', ctypes.c_int64),
+                ('loop_start', ctypes.c_int64),
+                ('loop_end', ctypes.c_int64),
+                ('loop_flag', ctypes.c_bool),
+                ('play_forever', ctypes.c_bool),
+                ('play_samples', ctypes.c_int64)]
+
+
+class _Lib(ctypes.Structure):
+    _fields_ = [('priv', ctypes.c_void_p),
+                ('format', ctypes.POINTER(_Format)),
+                ('decoder', ctypes.POINTER(_Decoder))]
+
+
+class _StreamFile(ctypes.Structure):
+    """libstreamfile_t; libstreamfile_close() is a static inline helper calling `close`."""
+
+
+_StreamFile._fields_ = [('user_data', ctypes.c_void_p),
+                        ('read', ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p,
+                                                  ctypes.c_int64, ctypes.c_int)),
+                        ('get_size', ctypes.CFUNCTYPE(ctypes.c_int64, ctypes.c_void_p)),
+                        ('get_name', ctypes.CFUNCTYPE(ctypes.c_char_p, ctypes.c_void_p)),
+                        ('open', ctypes.CFUNCTYPE(ctypes.POINTER(_StreamFile), ctypes.c_void_p, ctypes.c_char_p)),
+                        ('close', ctypes.CFUNCTYPE(None, ctypes.POINTER(_StreamFile)))]
+
+
+class _ClassicHeader(ctypes.Structure):
+    # first fields of the classic VGMSTREAM struct
+    _fields_ = [('num_samples', ctypes.c_int32),
+                ('sample_rate', ctypes.c_int32),
+                ('channels', ctypes.c_int)]
+
+
+def library_candidates(site_packages=None):
+    paths = []
+    if site_packages:
+        for sub in ('', 'vgmstream'):
+            for name in _LIB_NAMES:
+                paths.append(os.path.join(site_packages, sub, name))
+    found = ctypes.util.find_library('vgmstream')
+    if found:
+        paths.append(found)
+    return paths
+
+
+class Libvgmstream:
+    """A loaded libvgmstream; decode(path) -> PcmAudio (raises RuntimeError on failure)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        if hasattr(os, 'add_dll_directory') and os.path.isdir(folder):
+            # bundled codec DLLs (libvorbis, ffmpeg...) live next to it on Windows
+            os.add_dll_directory(folder)
+        self._dll = ctypes.CDLL(path)
+        if hasattr(self._dll, 'libvgmstream_init'):
+            self.api = 2
+            self._bind_v2()
+        elif hasattr(self._dll, 'init_vgmstream'):
+            self.api = 1
+            self._bind_classic()
+        else:
+            raise OSError(f'libvgmstream API를 찾을 수 없습니다: {path}')
+
+    def _bind_v2(self):
+        d = self._dll
+        d.libvgmstream_init.restype = ctypes.POINTER(_Lib)
+        d.libvgmstream_init.argtypes = []
+        d.libvgmstream_free.argtypes = [ctypes.POINTER(_Lib)]
+        d.libstreamfile_open_from_stdio.restype = ctypes.POINTER(_StreamFile)
+        d.libstreamfile_open_from_stdio.argtypes = [ctypes.c_char_p]
+        d.libvgmstream_open_stream.restype = ctypes.c_int
+        d.libvgmstream_open_stream.argtypes = [ctypes.POINTER(_Lib), ctypes.POINTER(_StreamFile), ctypes.c_int]
+        d.libvgmstream_render.restype = ctypes.c_int
+        d.libvgmstream_render.argtypes = [ctypes.POINTER(_Lib)]
+
+    def _bind_classic(self):
+        d = self._dll
+        d.init_vgmstream.restype = ctypes.c_void_p
+        d.init_vgmstream.argtypes = [ctypes.c_char_p]
+        d.render_vgmstream.argtypes = [ctypes.c_void_p, ctypes.c_int32, ctypes.c_void_p]
+        d.close_vgmstream.argtypes = [ctypes.c_void_p]
+
+    def decode(self, in_path: str) -> PcmAudio:
+        name = os.fsencode(os.path.abspath(in_path))
+        return self._decode_v2(name) if self.api == 2 else self._decode_classic(name)
+
+    def _decode_v2(self, name: bytes) -> PcmAudio:
+        d = self._dll
+        lib = d.libvgmstream_init()
+        if not lib:
+            raise RuntimeError('libvgmstream_init 실패')
+        sf = None
+        try:
+            sf = d.libstreamfile_open_from_stdio(name)
+            if not sf:
+                raise RuntimeError('파일을 열 수 없습니다')
+            if d.libvgmstream_open_stream(lib, sf, 0) < 0:
+                raise RuntimeError('지원하지 않는 형식')
+            fmt = lib.contents.format.contents
+            if fmt.sample_format != _SFMT_PCM16:
+                raise RuntimeError(f'지원하지 않는 샘플 형식: {fmt.sample_format}')
+            expected = max(0, fmt.play_samples) * fmt.channels * 2
+            pcm = bytearray(expected)
+            pos = 0
+            dec = lib.contents.decoder
+            while not dec.contents.done:
+                if d.libvgmstream_render(lib) < 0:
+                    raise RuntimeError('디코드 실패')
+                size = dec.contents.buf_bytes
+                if size <= 0:
+                    break
+                chunk = ctypes.string_at(dec.contents.buf, size)
+                if pos + size <= len(pcm):
+                    pcm[pos:pos + size] = chunk
+                else:
+                    pcm[pos:] = chunk
+                pos += size
+            del pcm[pos:]
+            return PcmAudio(pcm, fmt.channels, fmt.sample_rate, 2)
+        finally:
+            if sf and sf.contents.close:
+                sf.contents.close(sf)
+            d.libvgmstream_free(lib)
+
+    def _decode_classic(self, name: bytes) -> PcmAudio:
+        d = self._dll
+        vgm = d.init_vgmstream(name)
+        if not vgm:
+            raise RuntimeError('지원하지 않는 형식')
+        try:
+            head = _ClassicHeader.from_address(vgm)
+            frames, channels = head.num_samples, head.channels
+            if frames <= 0 or channels <= 0:
+                raise RuntimeError('샘플 정보가 없습니다')
+            pcm = bytearray(frames * channels * 2)
+            buf = (ctypes.c_char * len(pcm)).from_buffer(pcm)
+            base = ctypes.addressof(buf)
+            done = 0
+            while done < frames:
+                n = min(RENDER_FRAMES, frames - done)
+                d.render_vgmstream(base + done * channels * 2, n, vgm)
+                done += n
+            del buf
+            return PcmAudio(pcm, channels, head.sample_rate, 2)
+        finally:
+            d.close_vgmstream(vgm)
+
+
+_LIBRARY = None     # Libvgmstream once loaded in this process; False if unavailable
+
+
+def load_library(site_packages=None, path=None):
+    """Load libvgmstream once per process; returns the Libvgmstream or False."""
+    global _LIBRARY
+    if _LIBRARY is not None:
+        return _LIBRARY
+    _LIBRARY = False
+    for candidate in ([path] if path else library_candidates(site_packages)):
+        if os.path.sep in candidate and not os.path.isfile(candidate):
+            continue
+        try:
+            _LIBRARY = Libvgmstream(candidate)
+            break
+        except (OSError, AttributeError):
+            # AttributeError: a symbol this ABI is bound against is missing
+            continue
+    return _LIBRARY
@@ -0,0 +1,31 @@
+"""wav_io.py
+
+In-memory PCM audio and a minimal RIFF/WAVE writer, shared by the decoders
+that produce samples themselves instead of writing files through vgmstream.
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+# pcm: bytes-like interleaved little-endian samples; sample_width in bytes
+PcmAudio = namedtuple('PcmAudio', 'pcm channels sample_rate sample_width')
+
+
+def wav_header(data_size: int, channels: int, sample_rate: int, sample_width: int = 2) -> bytes:
+    """44-byte canonical PCM WAVE header for `data_size` bytes of samples."""
+    block_align = channels * sample_width
+    fmt = struct.pack('<HHIIHH', 1, channels, sample_rate, sample_rate * block_align, block_align,
+                      sample_width * 8)
+    return (b'RIFF' + struct.pack('<I', 36 + data_size) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + b'data' + struct.pack('<I', data_size))
+
+
+def write_wav(path, audio: PcmAudio):
+    """Write `audio` as a PCM .wav (via a temp file, so readers never see half a file)."""
+    tmp = f'{path}.part'
+    with open(tmp, 'wb') as fh:
+        fh.write(wav_header(len(audio.pcm), audio.channels, audio.sample_rate, audio.sample_width))
+        fh.write(audio.pcm)
+    os.replace(tmp, path)
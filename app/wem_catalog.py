@@ -0,0 +1,197 @@
+"""wem_catalog.py
+
+Header-only metadata catalog of extracted .wem files.
+
+Each file's first HEADER_PROBE_BYTES are read on a thread pool (the reads are
+small and mostly wait on the disk, so threads overlap them well) and the
+RIFF/`fmt `/`vorb` headers give codec, channels, sample rate, sample count
+and duration, stored in a SQLite catalog next to the input. Files unchanged
+since the last scan (size, mtime) are not read again. Converters can then
+decide before decoding: skip very short clips, route ADPCM/PCM to the
+built-in decoder, process the longest files first.
+
+WEMs still inside .pck files get the same fields in the PCK index
+(unpack_pck.py --index-only, see pck_index.py).
+
+Usage examples:
+  python app/wem_catalog.py --input input
+  python app/wem_catalog.py --input input --list --min-duration 0.2 --sort duration
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from wem_info import HEADER_PROBE_BYTES, parse_wem_header
+
+CATALOG_NAME = 'wem_catalog.sqlite'
+
+# Column order of `files`; select() returns dicts with these keys.
+COLUMNS = ('path', 'size', 'mtime_ns', 'codec', 'channels', 'sample_rate', 'num_samples', 'duration')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    codec TEXT,
+    channels INTEGER,
+    sample_rate INTEGER,
+    num_samples INTEGER,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_files_duration ON files (duration);
+"""
+
+SORT_KEYS = ('path', 'duration', 'size')
+
+
+def scan_file(path: str, size: int, mtime_ns: int) -> tuple:
+    """Catalog row (COLUMNS order) of one .wem; header fields are None if unreadable."""
+    try:
+        with open(path, 'rb') as fh:
+            info = parse_wem_header(fh.read(HEADER_PROBE_BYTES))
+    except Exception:
+        return path, size, mtime_ns, None, None, None, None, None
+    return (path, size, mtime_ns, info['codec'], info['channels'], info['sample_rate'],
+            info['num_samples'], info['duration'])
+
+
+def find_wems(root):
+    """(absolute path, size, mtime_ns) of every .wem under `root`."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.name.lower().endswith('.wem'):
+                    st = e.stat()
+                    yield os.path.abspath(e.path), st.st_size, st.st_mtime_ns
+
+
+class WemCatalog:
+    """SQLite-backed header catalog."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=60)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def known(self) -> dict:
+        """path -> (size, mtime_ns) of every cataloged file."""
+        rows = self._conn.execute('SELECT path, size, mtime_ns FROM files')
+        return {r['path']: (r['size'], r['mtime_ns']) for r in rows}
+
+    def update(self, rows, removed=()):
+        with self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO files ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})', rows)
+            self._conn.executemany('DELETE FROM files WHERE path = ?', ((p,) for p in removed))
+
+    def select(self, min_duration=None, codec=None, sort: str = 'path', descending: bool = False) -> list:
+        """Cataloged files, optionally at least `min_duration` seconds long and/or of one codec."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f'정렬 기준은 {", ".join(SORT_KEYS)} 중 하나여야 합니다')
+        where, params = [], []
+        if min_duration:
+            # files without a known duration are kept
+            where.append('(duration IS NULL OR duration >= ?)')
+            params.append(float(min_duration))
+        if codec:
+            where.append('codec = ?')
+            params.append(codec.upper())
+        sql = f'SELECT {", ".join(COLUMNS)} FROM files'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {sort} {"DESC" if descending else "ASC"}, path'
+        return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def summary(self) -> list:
+        """(codec, files, total seconds, shortest, longest) per codec."""
+        return [tuple(r) for r in self._conn.execute(
+            'SELECT codec, COUNT(*), SUM(duration), MIN(duration), MAX(duration) FROM files '
+            'GROUP BY codec ORDER BY COUNT(*) DESC')]
+
+
+def scan(root, db_path, workers: int = 16, force: bool = False, report=print):
+    """Catalog every .wem under `root` into `db_path`; returns (scanned, unchanged, removed)."""
+    start = time.perf_counter()
+    with WemCatalog(db_path) as catalog:
+        known = catalog.known()
+        found = list(find_wems(root))
+        todo = [f for f in found if force or known.get(f[0]) != (f[1], f[2])]
+        root_abs = os.path.abspath(root) + os.sep
+        seen = {f[0] for f in found}
+        removed = [p for p in known if p.startswith(root_abs) and p not in seen]
+        rows = []
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='wem-scan') as pool:
+            for row in pool.map(lambda f: scan_file(*f), todo, chunksize=64):
+                rows.append(row)
+                if len(rows) >= 4096:
+                    catalog.update(rows)
+                    rows = []
+        catalog.update(rows, removed)
+    elapsed = time.perf_counter() - start
+    report(f'[정보] 헤더 스캔: {len(todo)}개 읽음, {len(found) - len(todo)}개 변경 없음, '
+           f'{len(removed)}개 삭제 ({elapsed:.2f}초, {len(todo) / max(elapsed, 1e-9):.0f} 파일/초)')
+    return len(todo), len(found) - len(todo), len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catalog .wem headers (codec, channels, rate, duration)')
+    parser.add_argument('--input', '-i', default='input', help='folder to scan (recursive)')
+    parser.add_argument('--catalog', default=None, help=f'catalog database (default: <input>/{CATALOG_NAME})')
+    parser.add_argument('--workers', '-w', type=int, default=16, help='reader threads (default 16)')
+    parser.add_argument('--force', action='store_true', help='read every header again')
+    parser.add_argument('--list', action='store_true', help='print the cataloged files as TSV instead of scanning')
+    parser.add_argument('--min-duration', type=float, default=None, help='with --list, skip clips shorter than this (s)')
+    parser.add_argument('--codec', default=None, help='with --list, only this codec (e.g. VORBIS, ADPCM, PCM)')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='path', help='with --list, sort order')
+    parser.add_argument('--desc', action='store_true', help='with --list, sort descending')
+    args = parser.parse_args()
+
+    db_path = args.catalog or os.path.join(args.input, CATALOG_NAME)
+    if args.list:
+        if not os.path.exists(db_path):
+            print(f'[오류] 카탈로그가 없습니다: {db_path}', file=sys.stderr)
+            sys.exit(2)
+        with WemCatalog(db_path) as catalog:
+            rows = catalog.select(args.min_duration, args.codec, args.sort, args.desc)
+        print('\t'.join(COLUMNS))
+        for r in rows:
+            print('\t'.join('' if r[c] is None else str(r[c]) for c in COLUMNS))
+        return
+
+    if not os.path.isdir(args.input):
+        print(f'[오류] 입력 디렉터리가 존재하지 않습니다: {args.input}', file=sys.stderr)
+        sys.exit(2)
+    scan(args.input, db_path, args.workers, args.force)
+    with WemCatalog(db_path) as catalog:
+        for codec, count, total, shortest, longest in catalog.summary():
+            if total is None:
+                print(f'  {codec or "알 수 없음"}: {count}개 (길이 정보 없음)')
+            else:
+                print(f'  {codec or "알 수 없음"}: {count}개, 총 {total / 60:.1f}분, '
+                      f'최소 {shortest:.2f}초, 최대 {longest:.2f}초')
+
+
+if __name__ == '__main__':
+    main()
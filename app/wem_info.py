@@ -0,0 +1,95 @@
+"""wem_info.py
+
+Read codec information from the RIFF header of a Wwise .wem without decoding.
+
+Only the chunk headers and the `fmt `/`vorb`/`fact` chunks are looked at, so
+this works on a small prefix of the file (or of a PCK/BNK entry slice).
+"""
+
+import struct
+
+# Wwise format tags seen in .wem files
+CODECS = {
+    0x0001: 'PCM',
+    0x0002: 'ADPCM',      # Wwise IMA ADPCM
+    0x0069: 'ADPCM',
+    0x0165: 'XMA2',
+    0x0166: 'XMA2',
+    0x3039: 'OPUSNX',
+    0x3040: 'OPUS',
+    0x3041: 'OPUSWW',
+    0x8311: 'PTADPCM',
+    0xAAC0: 'AAC',
+    0xFFFE: 'PCM',        # WAVE_FORMAT_EXTENSIBLE, used by Wwise for PCM
+    0xFFFF: 'VORBIS',
+}
+
+# Enough bytes to cover RIFF + fmt (+ the start of vorb/data) for any .wem
+HEADER_PROBE_BYTES = 4096
+
+# codecs whose fmt extension starts with the sample count (Wwise Vorbis with
+# the vorb data folded into fmt, Wwise Opus)
+_FMT_SAMPLE_COUNT = (0xFFFF, 0x3040, 0x3041)
+
+
+def parse_wem_header(buf) -> dict:
+    """Parse the RIFF/RIFX header of a .wem held in `buf` (bytes/memoryview).
+
+    Returns a dict with codec, format_tag, channels, sample_rate, avg_bytes,
+    block_align, bits, data_size and data_offset (both None when the data chunk
+    header isn't in `buf`), big_endian, num_samples and duration (see
+    sample_count()). Raises ValueError if `buf` is not a RIFF/RIFX WAVE file.
+    """
+    head = bytes(buf[0:12])
+    if len(head) < 12 or head[8:12] != b'WAVE' or head[0:4] not in (b'RIFF', b'RIFX'):
+        raise ValueError('RIFF/WAVE 헤더가 아닙니다')
+    endian = '>' if head[0:4] == b'RIFX' else '<'
+
+    info = {'codec': None, 'format_tag': None, 'channels': None, 'sample_rate': None,
+            'avg_bytes': None, 'block_align': None, 'bits': None, 'data_size': None,
+            'data_offset': None, 'big_endian': endian == '>', 'num_samples': None, 'duration': None}
+    size = len(buf)
+    pos = 12
+    header_samples = None
+    while pos + 8 <= size:
+        tag = bytes(buf[pos:pos + 4])
+        length = struct.unpack_from(endian + 'I', buf, pos + 4)[0]
+        body = pos + 8
+        if tag == b'fmt ' and body + 16 <= size:
+            fmt_tag, channels, rate, avg, align, bits = struct.unpack_from(endian + 'HHIIHH', buf, body)
+            info.update(codec=CODECS.get(fmt_tag, f'0x{fmt_tag:04X}'), format_tag=fmt_tag,
+                        channels=channels, sample_rate=rate, avg_bytes=avg,
+                        block_align=align, bits=bits)
+            if fmt_tag in _FMT_SAMPLE_COUNT and length >= 0x1C and body + 0x1C <= size:
+                header_samples = struct.unpack_from(endian + 'I', buf, body + 0x18)[0]
+        elif tag in (b'vorb', b'fact') and length >= 4 and body + 4 <= size:
+            header_samples = struct.unpack_from(endian + 'I', buf, body)[0]
+        elif tag == b'data':
+            info['data_size'] = length
+            info['data_offset'] = body
+            break
+        pos = body + length + (length & 1)
+    if info['format_tag'] is None:
+        raise ValueError('fmt 청크를 찾을 수 없습니다')
+    info['num_samples'] = sample_count(info, header_samples)
+    if info['num_samples'] is not None and info['sample_rate']:
+        info['duration'] = info['num_samples'] / info['sample_rate']
+    elif info['data_size'] and info['avg_bytes']:
+        # no sample count in the header: estimate from the average byte rate
+        info['duration'] = info['data_size'] / info['avg_bytes']
+    return info
+
+
+def sample_count(info: dict, header_samples=None):
+    """Samples per channel: computed for PCM / IMA ADPCM, else the count stored
+    in the vorb/fact chunk or fmt extension (`header_samples`), else None."""
+    data_size, channels, align = info['data_size'], info['channels'], info['block_align']
+    if data_size is not None and channels and align:
+        if info['format_tag'] in (0x0001, 0xFFFE):
+            return data_size // align
+        if info['format_tag'] == 0x0002 and align > 4 * channels:
+            per_block = (align - 4 * channels) // channels * 2
+            full, rest = divmod(data_size, align)
+            tail = (rest - 4 * channels) // channels * 2 if rest > 4 * channels else 0
+            return full * per_block + tail
+    return header_samples or None
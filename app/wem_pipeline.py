@@ -0,0 +1,73 @@
+"""wem_pipeline.py
+
+Decode .wem files straight into Whisper-ready float32 arrays.
+
+Used by `transcribe.py --from-wem`: decoding runs on a small thread pool in
+the parent (the built-in decoder and NumPy release the GIL for the heavy
+parts, vgmstream runs as a child process) and the samples go to the Whisper
+workers in memory, so no intermediate .wav has to be written and read back.
+At most `max_pending` decodes are in flight or waiting to be consumed, which
+bounds the memory held by decoded audio.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from audio_prep import require_numpy, whisper_float
+import convert_wem
+from convert_wem import decode_to_audio, discover_cli, try_import_vgmstream
+from vgmstream_lib import load_library
+from wav_io import write_wav
+
+
+def decode_for_whisper(wem: str, site_packages=None, wav_path=None):
+    """16 kHz mono float32 samples of `wem`; also writes the full-format .wav to `wav_path` if given."""
+    audio = decode_to_audio(wem, site_packages)
+    if wav_path:
+        write_wav(wav_path, audio)
+    return whisper_float(audio)
+
+
+def prepare_decoders(site_packages=None):
+    """Resolve the vgmstream backends once, before the decode threads start.
+
+    The lookups cache per process and run subprocesses (CLI probing,
+    find_library), so they're done up front rather than raced by the threads.
+    """
+    load_library(site_packages, convert_wem.LIBVGMSTREAM_PATH)
+    try_import_vgmstream(site_packages)
+    discover_cli(site_packages)
+
+
+def iter_decoded(jobs, site_packages=None, workers: int = 2, max_pending: int = 8):
+    """Decode `jobs` = [(key, wem, wav_path or None), ...] and yield (key, samples, error).
+
+    Results come in completion order; `error` is the exception when decoding
+    failed (samples is then None). A new decode is only started when the
+    consumer has taken a result, keeping at most `max_pending` arrays alive.
+    """
+    require_numpy()
+    prepare_decoders(site_packages)
+    it = iter(jobs)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='wem-decode') as pool:
+        def fill():
+            while len(pending) < max_pending:
+                try:
+                    key, wem, wav_path = next(it)
+                except StopIteration:
+                    return
+                pending[pool.submit(decode_for_whisper, wem, site_packages, wav_path)] = key
+
+        fill()
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = pending.pop(fut)
+                try:
+                    samples = fut.result()
+                except Exception as e:
+                    yield key, None, e
+                else:
+                    yield key, samples, None
+                del fut
+            fill()
@@ -0,0 +1,101 @@
+"""whisper_batch.py
+
+Batched faster-whisper inference over many short clips.
+
+WhisperModel.transcribe() pads every clip to a 30 s window and runs the
+encoder and decoder for one clip at a time; for 1-5 s voice lines nearly all
+of that compute is padding. Here the clips of a batch are stacked into one
+encoder pass and decoded together with one CTranslate2 generate() call (the
+same calls faster-whisper's BatchedInferencePipeline makes for the chunks of a
+single long file), then each result's timestamp tokens are split back into
+that clip's segments. Clips longer than one window are left to the caller.
+"""
+
+from math import ceil
+
+WINDOW_SECONDS = 30
+SAMPLE_RATE = 16000
+
+# faster-whisper's defaults for dropping a window as silence
+NO_SPEECH_THRESHOLD = 0.6
+LOG_PROB_THRESHOLD = -1.0
+
+
+def supports_batching(model) -> bool:
+    """True if this faster-whisper version exposes the pieces used here (1.x)."""
+    return all(hasattr(model, name) for name in
+               ('feature_extractor', 'encode', 'get_prompt', '_split_segments_by_timestamps', 'hf_tokenizer'))
+
+
+def fits_window(samples) -> bool:
+    return len(samples) <= WINDOW_SECONDS * SAMPLE_RATE
+
+
+def _features(model, clips):
+    import numpy as np
+    from faster_whisper.audio import pad_or_trim
+    return np.stack([pad_or_trim(model.feature_extractor(clip)[..., :-1]) for clip in clips])
+
+
+def transcribe_clips(model, clips, beam_size: int = 5):
+    """Transcribe 16 kHz float32 `clips` (each at most 30 s) in one batch.
+
+    Returns [(segments, language), ...] in input order; segments are dicts
+    with start, end and text, like the per-file path produces.
+    """
+    from faster_whisper.tokenizer import Tokenizer
+    from faster_whisper.transcribe import get_suppressed_tokens
+
+    if not clips:
+        return []
+    encoder_output = model.encode(_features(model, clips))
+    multilingual = model.model.is_multilingual
+    if multilingual:
+        # most likely language token per clip, e.g. '<|ko|>' -> 'ko'
+        languages = [probs[0][0][2:-2] for probs in model.model.detect_language(encoder_output)]
+    else:
+        languages = ['en'] * len(clips)
+
+    tokenizers = {}
+    for language in set(languages):
+        tokenizers[language] = Tokenizer(model.hf_tokenizer, multilingual, task='transcribe', language=language)
+    prompts = [model.get_prompt(tokenizers[language], []) for language in languages]
+    any_tokenizer = tokenizers[languages[0]]
+    results = model.model.generate(
+        encoder_output,
+        prompts,
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=get_suppressed_tokens(any_tokenizer, [-1]),
+        return_scores=True,
+        return_no_speech_prob=True,
+    )
+
+    out = []
+    for clip, language, result in zip(clips, languages, results):
+        tokenizer = tokenizers[language]
+        tokens = result.sequences_ids[0]
+        # scores are length-normalized; undo it as faster-whisper does
+        avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOG_PROB_THRESHOLD:
+            out.append(([], language))
+            continue
+        duration = len(clip) / SAMPLE_RATE
+        pieces, _, _ = model._split_segments_by_timestamps(
+            tokenizer=tokenizer,
+            tokens=tokens,
+            time_offset=0.0,
+            segment_size=int(ceil(duration) * model.frames_per_second),
+            segment_duration=duration,
+            seek=0,
+        )
+        segments = []
+        for piece in pieces:
+            text = tokenizer.decode(piece['tokens']).strip()
+            start = min(float(piece['start']), duration)
+            end = min(float(piece['end']), duration)
+            if text and end > start:
+                segments.append({'start': start, 'end': end, 'text': text})
+        out.append((segments, language))
+    return out
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the app modules import each other by bare name (app/ is the script folder)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'app'))
@@ -0,0 +1,55 @@
+import pytest
+
+from clip_packing import SAMPLE_RATE, build_window, pack_windows, split_segments
+
+
+def test_pack_windows_fills_up_to_the_window():
+    # 1 s lead guard + 4 x (5 s clip + 1 s guard) = 25 s; a fifth clip would need 31 s
+    assert pack_windows([5.0] * 6) == [[0, 1, 2, 3], [4, 5]]
+
+
+def test_pack_windows_unknown_and_long_clips_alone():
+    assert pack_windows([2.0, None, 2.0, 29.0, 1.0, 1.0]) == [[0], [1], [2], [3], [4, 5]]
+
+
+def test_build_window_spans():
+    np = pytest.importorskip('numpy')
+    clips = [np.ones(SAMPLE_RATE, dtype=np.float32), np.ones(SAMPLE_RATE // 2, dtype=np.float32)]
+    buffer, spans = build_window(clips, guard=1.0)
+    assert spans == [(1.0, 2.0), (3.0, 3.5)]
+    assert len(buffer) == int(4.5 * SAMPLE_RATE)
+    assert buffer[:SAMPLE_RATE].max() == 0 and buffer[SAMPLE_RATE:2 * SAMPLE_RATE].min() == 1
+
+
+SPANS = [(1.0, 2.0), (3.0, 3.5)]
+
+
+def seg(start, end, text='x'):
+    return {'start': start, 'end': end, 'text': text}
+
+
+def test_split_segments_relative_times():
+    per_clip, rerun = split_segments([seg(1.1, 1.9, 'a'), seg(3.0, 3.4, 'b')], SPANS)
+    assert rerun == set()
+    assert [s['text'] for s in per_clip[0]] == ['a'] and [s['text'] for s in per_clip[1]] == ['b']
+    assert per_clip[0][0]['start'] == pytest.approx(0.1) and per_clip[0][0]['end'] == pytest.approx(0.9)
+    assert per_clip[1][0]['start'] == pytest.approx(0.0) and per_clip[1][0]['end'] == pytest.approx(0.4)
+
+
+def test_split_segments_drops_guard_only_segments():
+    per_clip, rerun = split_segments([seg(2.2, 2.8)], SPANS)
+    assert per_clip == [[], []] and rerun == set()
+
+
+def test_split_segments_overhang_within_tolerance():
+    # 0.1 s into the second clip stays with the first, clipped to its end
+    per_clip, rerun = split_segments([seg(1.5, 3.1)], SPANS)
+    assert rerun == set() and per_clip[1] == []
+    assert per_clip[0][0]['end'] == pytest.approx(1.0)
+
+
+def test_split_segments_crossing_marks_both_for_rerun():
+    # 0.3 s into the second clip is past the 0.2 s tolerance
+    per_clip, rerun = split_segments([seg(1.5, 3.3), seg(1.0, 1.2, 'kept')], SPANS)
+    assert rerun == {0, 1}
+    assert [s['text'] for s in per_clip[0]] == ['kept'] and per_clip[1] == []
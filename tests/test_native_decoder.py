@@ -0,0 +1,62 @@
+import random
+import struct
+
+import pytest
+
+import native_decoder
+from native_decoder import UnsupportedCodec, decode_ima, decode_wem_bytes
+from synth_pck import WEM_HEADER_BYTES, make_wem
+
+
+def _blocks(channels, count, seed=0):
+    rng = random.Random(seed)
+    out = b''
+    for _ in range(count):
+        for _ in range(channels):
+            out += struct.pack('<hBB', rng.randint(-2000, 2000), rng.randint(0, 88), 0)
+        out += rng.randbytes(0x20 * channels)
+    return out
+
+
+def test_first_nibbles():
+    # predictor 0, step index 0; nibble 7 adds 7>>3 + 7>>2 + 7>>1 + 7 = 11, then the index moves to 8 (step 16)
+    block = struct.pack('<hBB', 0, 0, 0) + bytes([0x77]) + bytes(0x1F)
+    pcm = struct.unpack('<64h', decode_ima(block, 1, 0x24))
+    assert pcm[0] == 11
+    assert pcm[1] == 11 + (16 >> 3) + (16 >> 2) + (16 >> 1) + 16
+    assert len(pcm) == 64
+
+
+@pytest.mark.parametrize('channels, big_endian', [(1, False), (2, False), (2, True)])
+def test_numpy_matches_python(channels, big_endian):
+    pytest.importorskip('numpy')
+    data = _blocks(channels, 5, seed=channels)
+    align = 0x24 * channels
+    assert native_decoder._decode_ima_numpy(data, channels, align, big_endian) == \
+        native_decoder._decode_ima_python(data, channels, align, big_endian)
+
+
+def test_partial_block_is_trimmed():
+    data = _blocks(1, 2)
+    full = decode_ima(data, 1, 0x24)
+    cut = decode_ima(data[:0x24 + 4 + 8], 1, 0x24)
+    assert len(cut) == (64 + 16) * 2
+    assert cut == full[:len(cut)]
+
+
+def test_pcm_wem_passthrough():
+    wem = make_wem(400, random.Random(1), 'pcm', channels=2, rate=22050)
+    audio = decode_wem_bytes(wem)
+    assert (audio.channels, audio.sample_rate, audio.sample_width) == (2, 22050, 2)
+    assert bytes(audio.pcm) == wem[WEM_HEADER_BYTES:]
+
+
+def test_adpcm_wem_frames():
+    wem = make_wem(0x24 * 3, random.Random(2), 'adpcm')
+    audio = decode_wem_bytes(wem)
+    assert len(audio.pcm) == 3 * 64 * 2
+
+
+def test_vorbis_is_unsupported():
+    with pytest.raises(UnsupportedCodec):
+        decode_wem_bytes(make_wem(100, random.Random(3), 'vorbis'))
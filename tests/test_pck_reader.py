@@ -0,0 +1,77 @@
+import random
+import struct
+
+import pytest
+
+from pck_reader import PCKReader, is_bnk, iter_bnk_media, parse_header
+from synth_pck import make_bnk, make_wem, write_pck
+
+
+def _payload(data):
+    return len(data), (lambda: data)
+
+
+def test_header_round_trip(tmp_path):
+    rng = random.Random(1)
+    bank = make_bnk(7, [(11, make_wem(100, rng)), (12, make_wem(36, rng))])
+    sound = make_wem(500, rng)
+    external = make_wem(64, rng)
+    tables = [[(7, 0, *_payload(bank))],
+              [(21, 1, *_payload(sound))],
+              [(2 ** 40 + 5, 1, *_payload(external))]]  # 64-bit external id
+    path = tmp_path / 'a.pck'
+    write_pck(path, {0: 'sfx', 1: 'korean'}, tables)
+
+    buf = path.read_bytes()
+    languages, entries = parse_header(buf)
+    assert languages == {0: 'sfx', 1: 'korean'}
+    big_id = 2 ** 40 + 5
+    assert [(e.section, e.id, e.name) for e in entries] == [
+        ('banks', 7, 'sfx/7.bnk'), ('sounds', 21, 'korean/21.wem'), ('externals', big_id, f'korean/{big_id}.wem')]
+    for e, data in zip(entries, (bank, sound, external)):
+        assert buf[e.offset:e.offset + e.size] == data
+
+    with PCKReader(path) as reader:
+        got = {name: bytes(view) for name, _offset, _length, view in reader.iter_entries()}
+    assert got == {'sfx/7.bnk': bank, 'korean/21.wem': sound, f'korean/{big_id}.wem': external}
+
+
+def test_header_without_externals(tmp_path):
+    sound = make_wem(40, random.Random(2))
+    path = tmp_path / 'old.pck'
+    write_pck(path, {0: 'sfx'}, [[], [(5, 0, *_payload(sound))]])
+    _, entries = parse_header(path.read_bytes())
+    assert [(e.section, e.name, e.size) for e in entries] == [('sounds', 'sfx/5.wem', len(sound))]
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        parse_header(b'RIFF' + b'\0' * 60)
+
+
+def test_entry_out_of_range(tmp_path):
+    path = tmp_path / 'cut.pck'
+    write_pck(path, {0: 'sfx'}, [[], [(5, 0, *_payload(make_wem(400, random.Random(3))))]])
+    with pytest.raises(ValueError):
+        parse_header(path.read_bytes()[:-100])
+
+
+def test_iter_bnk_media():
+    rng = random.Random(4)
+    wems = [(11, make_wem(100, rng)), (12, make_wem(36, rng))]
+    bank = make_bnk(7, wems)
+    assert is_bnk('x', bank) and is_bnk('x.bnk', b'')
+    media = [(wem_id, bytes(view)) for wem_id, offset, size, view in iter_bnk_media(bank)]
+    assert media == wems
+
+
+def test_bank_without_media_yields_nothing():
+    assert list(iter_bnk_media(make_bnk(7, []))) == []
+
+
+def test_broken_didx():
+    bank = bytearray(make_bnk(7, [(11, make_wem(100, random.Random(5)))]))
+    didx = bank.index(b'DIDX') + 8
+    struct.pack_into('<I', bank, didx + 8, 10 ** 6)   # size beyond DATA
+    with pytest.raises(ValueError):
+        list(iter_bnk_media(bytes(bank)))
@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scheduler import BudgetScheduler, parse_size
+
+
+@pytest.mark.parametrize('text, expected', [
+    (None, None), ('', None), ('0', None), ('512', 512), ('4k', 4096), ('512M', 512 * 1024 ** 2),
+    ('1.5GB', int(1.5 * 1024 ** 3)), (' 2 GiB ', 2 * 1024 ** 3),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_parse_size_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_size('lots')
+
+
+def _jobs(costs, log, lock, delay=0.0):
+    def run(key):
+        with lock:
+            log.append(('start', key))
+        time.sleep(delay(key) if callable(delay) else delay)
+        with lock:
+            log.append(('end', key))
+        return key
+    return [(cost, key, run, (key,)) for key, cost in costs]
+
+
+def test_largest_first():
+    log, lock = [], threading.Lock()
+    with ThreadPoolExecutor(1) as ex:
+        done = [key for key, fut in BudgetScheduler(1).run(ex, _jobs([('a', 1), ('b', 30), ('c', 5)], log, lock))]
+    assert done == ['b', 'c', 'a']
+
+
+def test_budget_caps_in_flight_cost():
+    log, lock = [], threading.Lock()
+    costs = {'a': 60, 'b': 50, 'c': 40, 'd': 30, 'e': 20}
+    scheduler = BudgetScheduler(4, memory_budget=100)
+    with ThreadPoolExecutor(4) as ex:
+        list(scheduler.run(ex, _jobs(costs.items(), log, lock, 0.02)))
+    running, peak = set(), 0
+    for event, key in log:
+        if event == 'start':
+            running.add(key)
+        else:
+            running.discard(key)
+        peak = max(peak, sum(costs[k] for k in running))
+    assert peak <= 100
+    assert scheduler.stats['peak_in_flight_bytes'] <= 100
+
+
+def test_oversized_job_runs_alone():
+    log, lock = [], threading.Lock()
+    with ThreadPoolExecutor(2) as ex:
+        done = [key for key, fut in BudgetScheduler(2, memory_budget=10).run(ex, _jobs([('big', 50)], log, lock))]
+    assert done == ['big']
+
+
+def test_blocked_job_is_not_starved():
+    # x holds the budget for a while; y can't fit next to it, and only two small jobs may pass y
+    log, lock = [], threading.Lock()
+    costs = [('x', 60), ('y', 60)] + [(f's{i}', 10) for i in range(20)]
+    scheduler = BudgetScheduler(4, memory_budget=100, max_bypass=2)
+    with ThreadPoolExecutor(4) as ex:
+        list(scheduler.run(ex, _jobs(costs, log, lock, lambda key: 0.2 if key == 'x' else 0.01)))
+    starts = [key for event, key in log if event == 'start']
+    assert starts.index('y') == 3
@@ -0,0 +1,70 @@
+import random
+
+from synth_pck import make_wem, write_pck
+from unpack_manifest import UnpackManifest, fingerprint
+from unpack_pck import unpack_one
+
+
+def _write(path, ids, seed):
+    rng = random.Random(seed)
+    sounds = []
+    for i in ids:
+        data = make_wem(64, rng)
+        sounds.append((i, 0, len(data), (lambda d=data: d)))
+    write_pck(path, {0: 'sfx'}, [[], sounds])
+
+
+def test_resume_keeps_written_entries(tmp_path):
+    pck = tmp_path / 'a.pck'
+    _write(pck, [1, 2], 1)
+    key = fingerprint(pck)
+    with UnpackManifest(tmp_path / 'm.sqlite') as mf:
+        assert mf.begin(pck, key) == (set(), set())
+        mf.record(pck, 'sfx/1.wem')
+        # interrupted: same file, still 'partial'
+        assert mf.lookup(pck) == (key, 'partial')
+        assert mf.begin(pck, key) == ({'sfx/1.wem'}, set())
+        mf.finish(pck)
+        assert mf.lookup(pck) == (key, 'done')
+
+
+def test_changed_pck_keeps_stale_names_until_finish(tmp_path):
+    pck = tmp_path / 'a.pck'
+    _write(pck, [1, 2], 1)
+    with UnpackManifest(tmp_path / 'm.sqlite') as mf:
+        mf.begin(pck, fingerprint(pck))
+        mf.record(pck, 'sfx/1.wem')
+        mf.record(pck, 'sfx/2.wem')
+        mf.finish(pck)
+
+        _write(pck, [2, 3, 4], 2)
+        new_key = fingerprint(pck)
+        assert mf.begin(pck, new_key) == (set(), {'sfx/1.wem', 'sfx/2.wem'})
+        mf.record(pck, 'sfx/3.wem')
+        # a failed attempt: the old names are still there on the next try
+        assert mf.begin(pck, new_key) == ({'sfx/3.wem'}, {'sfx/1.wem', 'sfx/2.wem'})
+        mf.finish(pck)
+        assert mf.begin(pck, new_key) == ({'sfx/3.wem'}, set())
+
+
+def test_unpack_removes_entries_dropped_by_new_version(tmp_path):
+    pck = tmp_path / 'a.pck'
+    manifest = str(tmp_path / 'm.sqlite')
+    _write(pck, [1, 2], 1)
+    ok, _, _ = unpack_one(pck, tmp_path, None, None, 'mmap', manifest, write_mode='sync')
+    assert ok
+    _write(pck, [2, 3], 2)
+    ok, _, _ = unpack_one(pck, tmp_path, None, None, 'mmap', manifest, write_mode='sync')
+    assert ok
+    assert sorted(p.name for p in (tmp_path / 'a' / 'sfx').iterdir()) == ['2.wem', '3.wem']
+
+
+def test_existing_folder_is_adopted(tmp_path):
+    pck = tmp_path / 'a.pck'
+    manifest = str(tmp_path / 'm.sqlite')
+    _write(pck, [1], 1)
+    (tmp_path / 'a').mkdir()
+    ok, msg, _ = unpack_one(pck, tmp_path, None, None, 'mmap', manifest, write_mode='sync')
+    assert ok and not (tmp_path / 'a' / 'sfx').exists()
+    with UnpackManifest(manifest) as mf:
+        assert mf.lookup(pck) == (fingerprint(pck), 'done')